@@ -0,0 +1,219 @@
+"""
+Batch Runner
+
+Simulates a directory of daily transaction files across a process pool,
+writing each day to its own output directory and combining the results
+into one summary table.
+"""
+import os
+import re
+import glob
+import datetime
+import numpy as np
+import pandas as pd
+from toll_queue import Facility, Lane, ServiceTimeModel, Util
+from worker_pool import WorkerPool
+
+
+def parse_lane_list(text):
+    """
+    Lane list from a comma-separated list of lane ID and type pairs, e.g.
+    '1:GEN,2:GEN,3:ETC'
+
+    :param text: String of lane ID and type pairs
+    :returns: list of (lane ID, lane type) tuples
+    :raises ValueError: invalid lane ID or type
+    """
+    lane_list = []
+    for item in text.split(','):
+        lane_id, separator, lane_type = item.strip().partition(':')
+        if not separator:
+            raise ValueError('lane must be ID:TYPE, not ' + repr(item))
+        lane_type = lane_type.strip().upper()
+        if lane_type not in Util().get_lane_types():
+            raise ValueError('Invalid Value, does not match existing lane type')
+        lane_list.append((int(lane_id), lane_type))
+    return lane_list
+
+
+class BatchRun:
+    """
+    Simulates daily transaction files with the same lane configuration.
+    Each day runs in a worker process and writes its queue, lane queue and
+    rolling summaries, and optionally a queue report, to a directory named
+    after the file, so days never share files or a working directory.
+
+    The start time of a day is the date in its file name, e.g.
+    20190504.csv, or midnight before its first transaction.
+
+    :param lane_list: list of (lane ID, lane type) tuples
+    :param output_directory: directory for the day directories and the
+        combined summary, created if missing
+    :param seconds: int number of seconds to simulate per day, at least 1.
+        Default is one day.
+    :param max_workers: int worker processes. 1 runs in this process.
+        Default is the number of CPUs.
+    :param seed: int common random numbers seed, so reruns of a day give
+        the same result. Default draws new processing times every run.
+    :param service_time_model: ServiceTimeModel. Default is the Lane
+        processing time parameters.
+    :param report: boolean, write an html queue report for each day
+    """
+    _summary_name = 'batch_summary.csv'
+    _date_pattern = re.compile(r'(\d{4})(\d{2})(\d{2})')
+
+    def __init__(self, lane_list, output_directory='output', seconds=60 * 60 * 24,
+                 max_workers=None, seed=None, service_time_model=None, report=False):
+        if seconds < 1:
+            raise ValueError('seconds must be at least 1')
+        if service_time_model is None:
+            service_time_model = ServiceTimeModel()
+        if seed is not None:
+            service_time_model = service_time_model.copy()
+            service_time_model.set_common_random_numbers(seed)
+        self._lane_list = list(lane_list)
+        self._output_directory = output_directory
+        self._seconds = seconds
+        self._max_workers = max_workers
+        self._service_time_model = service_time_model
+        self._report = report
+
+    def find_files(self, pattern):
+        """
+        :param pattern: directory of csv files, or glob pattern
+        :returns: list of file paths in name order
+        """
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.csv')
+        return sorted(glob.glob(pattern))
+
+    def start_time(self, path, dataframe):
+        """
+        :param path: String path of the daily file
+        :param dataframe: dataframe of the day's transactions
+        :returns: datetime.datetime date in the file name, or midnight before
+            the first transaction
+        """
+        match = self._date_pattern.search(os.path.basename(path))
+        if match is not None:
+            try:
+                return datetime.datetime(*[int(part) for part in match.groups()])
+            except ValueError:
+                pass
+        if dataframe.empty:
+            raise ValueError('no date in file name and no transactions: ' + path)
+        first = dataframe['trans date/time'].min()
+        return datetime.datetime(first.year, first.month, first.day)
+
+    def run(self, pattern):
+        """
+        Simulate every daily file and write the combined summary.
+
+        :param pattern: directory of csv files, or glob pattern
+        :returns: dataframe with one row per day, see run_day
+        :raises ValueError: no files match, or files in different
+            directories share a name
+        """
+        paths = self.find_files(pattern)
+        if not paths:
+            raise ValueError('no files match ' + str(pattern))
+        # each day writes to a directory named after its file
+        names = [self.day_name(path) for path in paths]
+        duplicates = sorted(set(name for name in names if names.count(name) > 1))
+        if duplicates:
+            raise ValueError('files share a name: ' + ', '.join(duplicates))
+        os.makedirs(self._output_directory, exist_ok=True)
+        with WorkerPool(self, self._max_workers) as pool:
+            rows = pool.map('run_day', paths)
+
+        summary = pd.DataFrame(rows).set_index('File')
+        summary.to_csv(os.path.join(self._output_directory, self._summary_name))
+        return summary
+
+    def day_name(self, path):
+        """
+        :param path: String path of the daily file
+        :returns: String name of the day's output directory and summary row
+        """
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def run_day(self, path):
+        """
+        Simulate one daily file. A day that fails is reported in the Error
+        column instead of stopping the batch.
+
+        :param path: String path of the daily file
+        :returns: dictionary with File, Start_Time, Transactions,
+            Peak_Queue, Peak_Time, Mean_Wait_Seconds, P95_Wait_Seconds,
+            Vehicle_Seconds_Delay and Error
+        """
+        name = self.day_name(path)
+        row = {'File': name, 'Start_Time': None, 'Transactions': 0,
+               'Peak_Queue': np.nan, 'Peak_Time': None, 'Mean_Wait_Seconds': np.nan,
+               'P95_Wait_Seconds': np.nan, 'Vehicle_Seconds_Delay': np.nan, 'Error': ''}
+        try:
+            dataframe = pd.read_csv(path)
+            dataframe['trans date/time'] = pd.to_datetime(dataframe['trans date/time'])
+            start_time = self.start_time(path, dataframe)
+            row['Start_Time'] = start_time
+            row['Transactions'] = dataframe.shape[0]
+
+            facility = Facility(start_time)
+            facility.set_rolling_windows()
+            for lane_id, lane_type in self._lane_list:
+                facility.add_lane(Lane(lane_id, lane_type))
+            facility.set_service_time_model(self._service_time_model)
+            Util().run_facility(facility, dataframe, self._seconds)
+            self._write_day(facility, os.path.join(self._output_directory, name))
+
+            summary = facility.get_queue_summary()
+            if summary:
+                peak_time = max(summary, key=lambda time: summary[time][0])
+                row['Peak_Queue'] = summary[peak_time][0]
+                row['Peak_Time'] = peak_time
+            # vehicles still queued at the end count with their wait so far
+            waits = np.array([wait.total_seconds() for wait in
+                              facility.get_wait_times() + facility.get_queued_wait_times()])
+            if waits.size:
+                row['Mean_Wait_Seconds'] = float(waits.mean())
+                row['P95_Wait_Seconds'] = float(np.percentile(waits, 95))
+                row['Vehicle_Seconds_Delay'] = float(waits.sum())
+        except Exception as error:
+            row['Error'] = type(error).__name__ + ': ' + str(error)
+        return row
+
+    def _write_day(self, facility, directory):
+        os.makedirs(directory, exist_ok=True)
+        facility.export_queue_summary_to_csv(os.path.join(directory, 'queue_summary.csv'))
+        facility.export_lane_queue_summary_to_csv(
+            os.path.join(directory, 'lane_queue_summary.csv'))
+        facility.export_rolling_summary_to_csv(os.path.join(directory, 'rolling_summary.csv'))
+        if self._report:
+            import render
+            render.write_report(facility, name='queue_report.html', directory=directory)
+
+
+# Batch simulation
+if __name__ == '__main__':
+    import argparse
+
+    PARSER = argparse.ArgumentParser(description='Simulate daily transaction files')
+    PARSER.add_argument('pattern', help='directory of csv files, or glob pattern')
+    PARSER.add_argument('--output', default='output', help='output directory')
+    PARSER.add_argument('--seconds', type=int, default=60 * 60 * 24,
+                        help='seconds simulated per day')
+    PARSER.add_argument('--workers', type=int, default=None, help='worker processes')
+    PARSER.add_argument('--seed', type=int, default=None, help='processing time seed')
+    PARSER.add_argument('--report', action='store_true', help='write daily reports')
+    PARSER.add_argument('--lanes', type=parse_lane_list,
+                        default='1:GEN,2:GEN,3:GEN,4:GEN,5:GEN,6:GEN',
+                        help='lane ID and type pairs, e.g. 1:GEN,2:GEN,3:ETC')
+    ARGS = PARSER.parse_args()
+
+    LANE_LIST = ARGS.lanes
+    SCRIPT_RUNTIME_START = datetime.datetime.now()
+    SUMMARY = BatchRun(LANE_LIST, output_directory=ARGS.output, seconds=ARGS.seconds,
+                       max_workers=ARGS.workers, seed=ARGS.seed,
+                       report=ARGS.report).run(ARGS.pattern)
+    print(SUMMARY.to_string())
+    print('Runtime: ' + str(datetime.datetime.now() - SCRIPT_RUNTIME_START))
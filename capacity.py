@@ -0,0 +1,224 @@
+"""
+Capacity Search
+
+Finds the demand multiplier at which a lane configuration stops keeping
+up with its arrivals, by bisection over scaled copies of an arrival set.
+"""
+import datetime
+import math
+import numpy as np
+import pandas as pd
+from toll_queue import Facility, Lane, ServiceTimeModel, Util
+from queue_screen import QueueScreen
+from worker_pool import WorkerPool
+
+
+def scale_arrivals(dataframe, multiplier, seed=0, jitter=datetime.timedelta(seconds=30)):
+    """
+    Scale demand by thinning or replicating arrivals. Copy *k* of a
+    transaction is kept when the multiplier exceeds *k* plus a uniform draw
+    fixed by the seed, so a higher multiplier always keeps every arrival of
+    a lower one. Copies after the first are moved by up to *jitter* either
+    way.
+
+    :param dataframe: dataframe of transactions
+    :param multiplier: float demand multiplier, e.g. 1.5 for 50% more
+    :param seed: int seed of the thinning draws and offsets
+    :param jitter: datetime.timedelta largest offset of a copy
+    :returns: dataframe of transactions in time order, indexed by copy
+        number times the number of transactions plus original position
+    """
+    if multiplier < 0:
+        raise ValueError('negative multiplier, invalid input')
+    count = dataframe.shape[0]
+    frames = []
+    for copy in range(int(math.ceil(multiplier))):
+        rng = np.random.default_rng([seed, copy])
+        keep = rng.random(count) < multiplier - copy
+        frame = dataframe.iloc[keep]
+        frame.index = copy * count + np.flatnonzero(keep)
+        if copy:
+            frame = frame.copy()
+            offsets = rng.uniform(-1, 1, count)[keep] * jitter.total_seconds()
+            frame['trans date/time'] = pd.to_datetime(frame['trans date/time']) + \
+                pd.to_timedelta(offsets, unit='s')
+        frames.append(frame)
+    if not frames:
+        return dataframe.iloc[:0]
+    return pd.concat(frames).sort_values('trans date/time', kind='stable')
+
+
+class CapacitySearch:
+    """
+    Locates the breaking point of lane configurations: the highest demand
+    multiplier at which the queues still drain. A run at a multiplier keeps
+    up when the queue clears within *drain_time* of the last arrival. It is
+    stopped early as soon as the backlog grows without bound, meaning it
+    passes *max_queue_per_lane* vehicles per lane or grows by at least one
+    vehicle per lane in each of *growth_checks* consecutive checks.
+
+    The QueueScreen estimate of the multiplier that saturates the busiest
+    interval brackets the search, and bisection narrows the bracket to the
+    relative *tolerance*. Every run uses the same seed, so arrivals and
+    processing times are shared between multipliers.
+
+    :param dataframe: dataframe of transactions
+    :param start_time: datetime.datetime start of the simulation
+    :param tolerance: float bracket width relative to the breaking point.
+        Default is 0.02.
+    :param drain_time: datetime.timedelta allowed after the last arrival
+        for queues to clear. Default is 15 minutes.
+    :param check_interval: datetime.timedelta between backlog checks.
+        Default is 5 minutes.
+    :param max_queue_per_lane: int vehicles per lane taken as unbounded
+    :param growth_checks: int consecutive growing checks taken as unbounded
+    :param max_workers: int worker processes for search_all. 1 runs in
+        this process. Default is the number of CPUs.
+    :param seed: int seed of the scaled arrivals and processing times
+    :param service_time_model: ServiceTimeModel with the distributions to
+        use. Its seed is replaced by *seed*.
+    """
+    # bracket expansions before giving up
+    _max_expansions = 8
+
+    def __init__(self, dataframe, start_time, tolerance=0.02,
+                 drain_time=datetime.timedelta(minutes=15),
+                 check_interval=datetime.timedelta(minutes=5), max_queue_per_lane=50,
+                 growth_checks=3, max_workers=None, seed=0, service_time_model=None):
+        if not isinstance(start_time, datetime.datetime):
+            raise TypeError('invalid input type, must be datetime.datetime')
+        if tolerance <= 0:
+            raise ValueError('tolerance must be positive')
+        if service_time_model is None:
+            service_time_model = ServiceTimeModel()
+        service_time_model = service_time_model.copy()
+        service_time_model.set_common_random_numbers(seed)
+
+        self._dataframe = dataframe
+        self._start_time = start_time
+        self._tolerance = tolerance
+        self._drain_seconds = int(drain_time.total_seconds())
+        self._check_seconds = max(1, int(check_interval.total_seconds()))
+        self._max_queue_per_lane = max_queue_per_lane
+        self._growth_checks = growth_checks
+        self._max_workers = max_workers
+        self._seed = seed
+        self._service_time_model = service_time_model
+
+    def screen_estimate(self, lane_list):
+        """
+        :param lane_list: list of (lane ID, lane type) tuples
+        :returns: float multiplier at which the busiest interval of the
+            QueueScreen estimate reaches full utilization
+        """
+        screen = QueueScreen(lane_list, service_time_model=self._service_time_model)
+        utilization = screen.estimate(self._dataframe)['Utilization'].max()
+        if not utilization > 0:
+            raise ValueError('no arrivals to scale')
+        return float(1 / utilization)
+
+    def keeps_up(self, lane_list, multiplier):
+        """
+        Simulate the lane configuration at a demand multiplier.
+
+        :param lane_list: list of (lane ID, lane type) tuples
+        :param multiplier: float demand multiplier
+        :returns: tuple of (boolean queues drained, int seconds simulated)
+        """
+        facility = Facility(self._start_time)
+        for lane_id, lane_type in lane_list:
+            facility.add_lane(Lane(lane_id, lane_type))
+        facility.set_service_time_model(self._service_time_model)
+        lane_count = len(lane_list)
+
+        df_sorted = scale_arrivals(self._dataframe, multiplier, self._seed)
+        times = pd.to_datetime(df_sorted['trans date/time']).values
+        last_arrival = times[-1] if times.size else np.datetime64(self._start_time)
+        seconds = int((last_arrival - np.datetime64(self._start_time)) //
+                      np.timedelta64(1, 's')) + 1 + self._drain_seconds
+        util = Util()
+        position = 0
+        backlogs = []
+        for second in range(seconds):
+            current_time = np.datetime64(facility.get_current_time()).astype(times.dtype)
+            end = int(np.searchsorted(times, current_time, side='left'))
+            if end > position:
+                util.add_transaction_from_dataframe(facility, df_sorted.iloc[position:end])
+                position = end
+            facility.advance_time_facility()
+
+            if position == len(times) and facility.total_queue() == 0:
+                return True, second + 1
+            if (second + 1) % self._check_seconds == 0:
+                backlogs.append(facility.total_queue())
+                if self._unbounded(backlogs, lane_count):
+                    return False, second + 1
+        return False, seconds
+
+    def search(self, lane_list):
+        """
+        Find the breaking point of a lane configuration.
+
+        :param lane_list: list of (lane ID, lane type) tuples
+        :returns: dictionary with Breaking_Point (highest multiplier found
+            to keep up), Failing_Multiplier (lowest found not to),
+            Screen_Estimate, Evaluations and Simulated_Seconds
+        """
+        estimate = self.screen_estimate(lane_list)
+        evaluations = []
+
+        def evaluate(multiplier):
+            result, seconds = self.keeps_up(lane_list, multiplier)
+            evaluations.append(seconds)
+            return result
+
+        # bracket around the screen estimate
+        low, high = estimate * 0.8, estimate * 1.25
+        high_fails = False
+        for _ in range(self._max_expansions):
+            if evaluate(low):
+                break
+            # a low that fails is the new high, known to fail
+            low, high, high_fails = low / 1.5, low, True
+        else:
+            low = 0.0
+        if not high_fails:
+            for _ in range(self._max_expansions):
+                if not evaluate(high):
+                    break
+                low, high = high, high * 1.5
+            else:
+                high = math.inf
+
+        while math.isfinite(high) and high - low > self._tolerance * high:
+            middle = (low + high) / 2
+            if evaluate(middle):
+                low = middle
+            else:
+                high = middle
+        return {'Breaking_Point': float(low), 'Failing_Multiplier': float(high),
+                'Screen_Estimate': float(estimate), 'Evaluations': len(evaluations),
+                'Simulated_Seconds': sum(evaluations)}
+
+    def search_all(self, configurations):
+        """
+        Find the breaking point of several lane configurations across a
+        process pool.
+
+        :param configurations: dictionary of lane lists keyed by name
+        :returns: dataframe indexed by name with the search columns
+        """
+        names = list(configurations)
+        lane_lists = [configurations[name] for name in names]
+        with WorkerPool(self, self._max_workers) as pool:
+            rows = pool.map('search', lane_lists)
+        return pd.DataFrame(rows, index=names)
+
+    def _unbounded(self, backlogs, lane_count):
+        if backlogs[-1] > self._max_queue_per_lane * lane_count:
+            return True
+        if len(backlogs) <= self._growth_checks:
+            return False
+        recent = backlogs[-self._growth_checks - 1:]
+        return all(later - earlier >= lane_count
+                   for earlier, later in zip(recent, recent[1:]))
@@ -0,0 +1,264 @@
+"""
+Toll Road Corridor
+
+Simulates plazas in sequence, with vehicles that clear one plaza arriving
+at the next after a travel time.
+"""
+import datetime
+import heapq
+import multiprocessing
+import numpy as np
+import pandas as pd
+from toll_queue import Facility, Transaction
+
+
+class _Plaza:
+    """
+    Advances a Facility through a window of seconds in this process.
+    Arrivals are (time, payment type, axles, transaction ID) tuples in time
+    order and completions are returned in the same form, with the time the
+    transaction completed.
+    """
+
+    def __init__(self, facility):
+        self._facility = facility
+        self._completed = None
+
+    def start_advance(self, seconds, arrivals):
+        self._completed = self.advance(seconds, arrivals)
+
+    def finish_advance(self):
+        return self._completed
+
+    def advance(self, seconds, arrivals):
+        facility = self._facility
+        completed = []
+        position = 0
+        for _ in range(seconds):
+            # arrivals are added once the facility time passes them
+            current_time = facility.get_current_time()
+            while position < len(arrivals) and arrivals[position][0] < current_time:
+                time, pmt_type, axles, trx_id = arrivals[position]
+                facility.add_transaction(Transaction(time, pmt_type, axles, trx_id))
+                position += 1
+            for transaction in facility.advance_time_facility():
+                completed.append((facility.get_current_time(), transaction.get_type(),
+                                  transaction.get_axels(), transaction.get_trx_id()))
+        return completed
+
+    def get_facility(self):
+        return self._facility
+
+    def close(self):
+        pass
+
+
+def _plaza_worker(connection, facility):
+    plaza = _Plaza(facility)
+    while True:
+        message = connection.recv()
+        if message is None:
+            connection.send(facility)
+            connection.close()
+            return
+        connection.send(plaza.advance(*message))
+
+
+class _PlazaProcess:
+    """
+    Advances a Facility held by a worker process. start_advance returns
+    immediately so all plazas advance through a window at once.
+    """
+
+    def __init__(self, facility):
+        self._connection, worker_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_plaza_worker,
+                                                args=(worker_connection, facility),
+                                                daemon=True)
+        self._process.start()
+        worker_connection.close()
+        self._facility = None
+
+    def start_advance(self, seconds, arrivals):
+        self._connection.send((seconds, arrivals))
+
+    def finish_advance(self):
+        return self._connection.recv()
+
+    def get_facility(self):
+        if self._facility is None:
+            self._connection.send(None)
+            self._facility = self._connection.recv()
+            self._process.join()
+        return self._facility
+
+    def close(self):
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+
+
+class Corridor:
+    """
+    Plazas in sequence along a toll road. Every vehicle that completes a
+    transaction at a plaza arrives at the next plaza after the travel time
+    between them, keeping its payment type, axles and transaction ID.
+    Vehicles enter at any plaza from a dataframe of transactions and leave
+    after the last plaza.
+
+    Plazas advance independently through windows one second longer than
+    the shortest travel time, since no vehicle can complete one plaza and
+    reach the next within a window, and hand vehicles off between windows.
+    With *processes* each plaza runs in its own worker process, so a
+    corridor takes about as long as its busiest plaza.
+
+    :param processes: boolean, run each plaza in a worker process
+    """
+
+    def __init__(self, processes=False):
+        self._processes = processes
+        self._facilities = []
+        self._travel_times = []
+        self._arrivals = []
+        self._sequence = 0
+        self._handoffs = 0
+        self._exits = 0
+
+    def add_plaza(self, facility, travel_time=None, dataframe=None):
+        """
+        Add plaza after the plazas already in the corridor
+
+        :param facility: Facility object with lanes, starting at the same
+            time as the other plazas
+        :param travel_time: datetime.timedelta travel time to the next
+            plaza. Not used for the last plaza.
+        :param dataframe: dataframe of transactions entering the corridor at
+            this plaza. The index is used as the transaction ID.
+        """
+        if not isinstance(facility, Facility):
+            raise TypeError('Incorrect type')
+        if travel_time is not None:
+            if not isinstance(travel_time, datetime.timedelta):
+                raise TypeError('invalid input type, must be datetime.timedelta')
+            if travel_time < datetime.timedelta():
+                raise ValueError('negative travel time, invalid input')
+        if self._facilities and \
+                facility.get_current_time() != self._facilities[0].get_current_time():
+            raise ValueError('plazas must start at the same time')
+
+        arrivals = []
+        if dataframe is not None:
+            df_sorted = dataframe.sort_values('trans date/time', kind='stable')
+            times = pd.to_datetime(df_sorted['trans date/time'])
+            rows = zip(times, df_sorted['Payment'], df_sorted['Axles'], df_sorted.index)
+            for time, pmt_type, axles, trx_id in rows:
+                arrivals.append((time.to_pydatetime(), self._sequence, pmt_type,
+                                 int(axles), trx_id))
+                self._sequence += 1
+        self._facilities.append(facility)
+        self._travel_times.append(travel_time)
+        self._arrivals.append(arrivals)
+
+    def run(self, seconds):
+        """
+        Simulate all plazas for the given number of seconds
+
+        :param seconds: int number of seconds to simulate
+        """
+        if not self._facilities:
+            raise ValueError('corridor has no plazas')
+        for index, travel_time in enumerate(self._travel_times[:-1]):
+            if travel_time is None:
+                raise ValueError('travel time required for plaza ' + str(index))
+
+        window = self.get_window()
+        if self._processes:
+            plazas = [_PlazaProcess(facility) for facility in self._facilities]
+        else:
+            plazas = [_Plaza(facility) for facility in self._facilities]
+        # tuples are (time, sequence, payment type, axles, transaction ID)
+        pending = [list(arrivals) for arrivals in self._arrivals]
+        for plaza_pending in pending:
+            heapq.heapify(plaza_pending)
+        current_time = self._facilities[0].get_current_time()
+
+        try:
+            elapsed = 0
+            while elapsed < seconds:
+                window_seconds = min(window, seconds - elapsed)
+                last_step = current_time + datetime.timedelta(seconds=window_seconds - 1)
+                for plaza, plaza_pending in zip(plazas, pending):
+                    plaza.start_advance(window_seconds, self._due(plaza_pending, last_step))
+                for index, plaza in enumerate(plazas):
+                    completed = plaza.finish_advance()
+                    if index + 1 == len(plazas):
+                        self._exits += len(completed)
+                        continue
+                    travel_time = self._travel_times[index]
+                    for time, pmt_type, axles, trx_id in completed:
+                        heapq.heappush(pending[index + 1],
+                                       (time + travel_time, self._sequence, pmt_type,
+                                        axles, trx_id))
+                        self._sequence += 1
+                    self._handoffs += len(completed)
+                elapsed += window_seconds
+                current_time += datetime.timedelta(seconds=window_seconds)
+            self._facilities = [plaza.get_facility() for plaza in plazas]
+        finally:
+            for plaza in plazas:
+                plaza.close()
+        self._arrivals = pending
+
+    def get_window(self):
+        """
+        :returns: int seconds plazas advance between hand-offs
+        """
+        travel_times = [travel_time for travel_time in self._travel_times[:-1]
+                        if travel_time is not None]
+        if not travel_times:
+            return 60 * 60 * 24
+        return int(min(travel_times).total_seconds()) + 1
+
+    def get_plazas(self):
+        """
+        :returns: list of Facility objects in corridor order. After a run
+            with worker processes these are the simulated copies.
+        """
+        return self._facilities
+
+    def get_handoffs(self):
+        """
+        :returns: int vehicles handed off between plazas
+        """
+        return self._handoffs
+
+    def get_exits(self):
+        """
+        :returns: int vehicles that completed the last plaza
+        """
+        return self._exits
+
+    def summary(self):
+        """
+        :returns: dataframe indexed by plaza number with columns Vehicles,
+            Peak_Queue and Mean_Wait_Seconds
+        """
+        rows = []
+        for facility in self._facilities:
+            queue_lengths = [value[0] for value in facility.get_queue_summary().values()]
+            waits = [wait.total_seconds() for wait in facility.get_wait_times()]
+            rows.append([len(waits), max(queue_lengths) if queue_lengths else 0,
+                         float(np.mean(waits)) if waits else 0.0])
+        column_names = ['Vehicles', 'Peak_Queue', 'Mean_Wait_Seconds']
+        return pd.DataFrame(data=rows, columns=column_names)
+
+    def _due(self, pending, last_step):
+        """
+        Remove and return arrivals the plaza adds within a window, those
+        before the time of its last step
+        """
+        due = []
+        while pending and pending[0][0] < last_step:
+            time, _, pmt_type, axles, trx_id = heapq.heappop(pending)
+            due.append((time, pmt_type, axles, trx_id))
+        return due
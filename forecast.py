@@ -0,0 +1,314 @@
+"""
+Queue Forecast
+
+Short-horizon forecasts of lane queues from the current state of a running
+Facility, so candidate lane changes can be compared before they are made.
+"""
+import os
+import datetime
+import numpy as np
+import pandas as pd
+from toll_queue import Lane, ServiceTimeModel, Transaction
+from worker_pool import WorkerPool
+
+
+def arrival_rates(dataframe, end_time, window=datetime.timedelta(minutes=15)):
+    """
+    Recent arrival rate by payment type
+
+    :param dataframe: dataframe of transactions with 'trans date/time' and
+        'Payment' columns
+    :param end_time: datetime.datetime end of the window, usually the
+        current Facility time
+    :param window: datetime.timedelta length of the window. Default is 15
+        minutes.
+    :returns: dictionary of vehicles per hour by payment type
+    """
+    times = pd.to_datetime(dataframe['trans date/time'])
+    end_time = pd.Timestamp(end_time)
+    recent = dataframe['Payment'][(times >= end_time - window) & (times < end_time)]
+    hours = window.total_seconds() / 3600
+    return {pmt_type: count / hours for pmt_type, count in recent.value_counts().items()}
+
+
+class OpenLane:
+    """
+    Forecast action opening a lane. A lane not in the Facility is added.
+
+    :param lane_id: int lane ID
+    :param lane_type: String lane type of a new lane, or new type of an
+        existing lane. Default keeps the type of an existing lane.
+    """
+
+    def __init__(self, lane_id, lane_type=None):
+        self._lane_id = lane_id
+        self._lane_type = lane_type
+
+    def __call__(self, facility):
+        try:
+            lane = facility.get_lane(self._lane_id)
+        except ValueError:
+            if self._lane_type is None:
+                raise ValueError('lane type required for new lane ' + str(self._lane_id))
+            facility.open_lane(Lane(self._lane_id, self._lane_type))
+            return
+        if self._lane_type is not None and self._lane_type != lane.get_lane_type():
+            facility.change_lane_type(self._lane_id, self._lane_type)
+        facility.open_lane(lane)
+
+    def __repr__(self):
+        if self._lane_type is None:
+            return 'OpenLane(' + str(self._lane_id) + ')'
+        return 'OpenLane(' + str(self._lane_id) + ', ' + str(self._lane_type) + ')'
+
+
+class CloseLane:
+    """
+    Forecast action closing a lane, see Facility.close_lane. When a waiting
+    transaction has no other open eligible lane, the queue drains through
+    the closed lane instead of being redistributed, as a scheduled close
+    does.
+
+    :param lane_id: int lane ID
+    :param redistribute: boolean, move waiting transactions
+    """
+
+    def __init__(self, lane_id, redistribute=False):
+        self._lane_id = lane_id
+        self._redistribute = redistribute
+
+    def __call__(self, facility):
+        lane = facility.get_lane(self._lane_id)
+        redistribute = self._redistribute and all(
+            [other for other in facility.get_eligible_lanes(transaction.get_type())
+             if other is not lane]
+            for transaction in lane.get_queue()[1:])
+        facility.close_lane(self._lane_id, redistribute)
+
+    def __repr__(self):
+        if self._redistribute:
+            return 'CloseLane(' + str(self._lane_id) + ', redistribute)'
+        return 'CloseLane(' + str(self._lane_id) + ')'
+
+
+class ChangeLaneType:
+    """
+    Forecast action changing a lane type, see Facility.change_lane_type
+
+    :param lane_id: int lane ID
+    :param lane_type: String new lane type
+    """
+
+    def __init__(self, lane_id, lane_type):
+        self._lane_id = lane_id
+        self._lane_type = lane_type
+
+    def __call__(self, facility):
+        facility.change_lane_type(self._lane_id, self._lane_type)
+
+    def __repr__(self):
+        return 'ChangeLaneType(' + str(self._lane_id) + ', ' + str(self._lane_type) + ')'
+
+
+class QueueForecast:
+    """
+    Forecasts lane queues over a short horizon from a copy of a running
+    Facility. Each candidate action is applied to its own copy, followed by
+    repeated forward simulations with Poisson arrivals at the given rates.
+    Replication *r* uses the same arrivals and processing time seed for
+    every action, so differences between actions are not masked by noise.
+
+    An action that leaves a payment type in the arrival rates with no open
+    eligible lane is reported as infeasible rather than simulated.
+
+    Only the current state is copied, not the queue summary history, so a
+    forecast costs the same early or late in a run. Replications run across
+    a process pool that stays open between forecasts, until the arrival
+    rates change; call close when done.
+
+    :param arrival_rates: dictionary of vehicles per hour by payment type,
+        see arrival_rates
+    :param horizon: datetime.timedelta forecast length. Default is 15
+        minutes.
+    :param replications: int forward simulations per action. Default is 50.
+    :param percentiles: list of queue length percentiles reported. Default
+        is the 10th, 50th and 90th.
+    :param sample_interval: datetime.timedelta between forecast times.
+        Default is 1 minute.
+    :param axles: int axles of the simulated vehicles. Default is 2.
+    :param seed: int seed of the first replication
+    :param max_workers: int worker processes. 1 runs in this process.
+        Default is the number of CPUs.
+    :param service_time_model: ServiceTimeModel with the distributions to
+        use. Its seed is replaced in each replication. Default is the
+        Facility model.
+    """
+
+    def __init__(self, arrival_rates, horizon=datetime.timedelta(minutes=15),
+                 replications=50, percentiles=(10, 50, 90),
+                 sample_interval=datetime.timedelta(minutes=1), axles=2, seed=0,
+                 max_workers=None, service_time_model=None):
+        if not isinstance(horizon, datetime.timedelta) or \
+                not isinstance(sample_interval, datetime.timedelta):
+            raise TypeError('invalid input type, must be datetime.timedelta')
+        if sample_interval.total_seconds() < 1 or sample_interval > horizon:
+            raise ValueError('sample_interval must be between 1 second and the horizon')
+        if replications < 1:
+            raise ValueError('at least 1 replication required')
+        self._pool = None
+        self.set_arrival_rates(arrival_rates)
+        self._horizon = horizon
+        self._replications = replications
+        self._percentiles = list(percentiles)
+        self._sample_interval = sample_interval
+        self._axles = axles
+        self._seed = seed
+        self._max_workers = max_workers
+        self._service_time_model = service_time_model
+
+    def set_arrival_rates(self, arrival_rates):
+        """
+        :param arrival_rates: dictionary of vehicles per hour by payment type
+        """
+        for pmt_type, rate in arrival_rates.items():
+            if rate < 0:
+                raise ValueError('negative arrival rate for ' + str(pmt_type))
+        # workers hold a copy of the forecast, so they restart with the new rates
+        self.close()
+        self._arrival_rates = dict(arrival_rates)
+
+    def get_arrival_rates(self):
+        """
+        :returns: dictionary of vehicles per hour by payment type
+        """
+        return self._arrival_rates
+
+    def forecast(self, facility, actions=None):
+        """
+        Forecast queue length percentiles by lane with no change and with
+        each candidate action.
+
+        :param facility: running Facility object, not modified
+        :param actions: list of actions, e.g. OpenLane(4)
+        :returns: dataframe with Action, Time, Lane, one column per
+            percentile, e.g. P90, and Feasible. Lane 'Total' is the whole
+            facility. An infeasible action has a single row with Feasible
+            False and no times, lanes or percentiles.
+        """
+        actions = [None] + list(actions or [])
+        # copy once, so workers are sent the state without its history
+        facility = facility.copy()
+        workers = 1 if self._max_workers == 1 else self._max_workers or os.cpu_count()
+        chunks = np.array_split(np.arange(self._replications),
+                                min(workers, self._replications))
+        tasks = [(facility, action, chunk.tolist()) for action in actions for chunk in chunks]
+        results = {index: [] for index in range(len(actions))}
+        for task, samples in enumerate(self._get_pool().map('_simulate_replications', tasks)):
+            results[task // len(chunks)].extend(samples)
+
+        frames = []
+        for index, action in enumerate(actions):
+            label = str(action) if action else 'No Change'
+            if any(samples is None for samples in results[index]):
+                frames.append(self._infeasible(label))
+            else:
+                frames.append(self._percentile_bands(label, results[index]))
+        return pd.concat(frames, ignore_index=True)
+
+    def simulate(self, facility, action=None, replication=0):
+        """
+        Simulate one replication forward from a copy of the Facility.
+
+        :param facility: Facility object, not modified
+        :param action: action applied before simulating, or None
+        :param replication: int replication number
+        :returns: dictionary of queue by lane dictionaries keyed by datetime,
+            one per sample interval, or None when a payment type in the
+            arrival rates has no open eligible lane after the action
+        """
+        facility = facility.copy()
+        model = self._service_time_model or facility.get_service_time_model() or \
+            ServiceTimeModel()
+        model = model.copy()
+        model.set_common_random_numbers(self._seed + replication)
+        facility.set_service_time_model(model)
+        if action is not None:
+            action(facility)
+        if not all(facility.get_eligible_lanes(pmt_type)
+                   for pmt_type, rate in self._arrival_rates.items() if rate > 0):
+            return None
+        return self._simulate_arrivals(facility, replication)
+
+    def _simulate_replications(self, task):
+        facility, action, replications = task
+        return [self.simulate(facility, action, replication)
+                for replication in replications]
+
+    def _simulate_arrivals(self, facility, replication):
+        pmt_types = sorted(self._arrival_rates)
+        rates = np.array([self._arrival_rates[pmt_type] / 3600 for pmt_type in pmt_types])
+        seconds = int(self._horizon.total_seconds())
+        rng = np.random.default_rng([self._seed, replication])
+        arrivals = rng.poisson(rates, size=(seconds, len(pmt_types)))
+
+        interval = int(self._sample_interval.total_seconds())
+        samples = {}
+        trx_id = 0
+        for second in range(seconds):
+            current_time = facility.get_current_time()
+            for column, count in enumerate(arrivals[second]):
+                for _ in range(count):
+                    facility.add_transaction(Transaction(current_time, pmt_types[column],
+                                                         self._axles, trx_id))
+                    trx_id += 1
+            facility.advance_time_facility()
+            if (second + 1) % interval == 0:
+                samples[facility.get_current_time()] = dict(facility.get_lane_queue())
+        return samples
+
+    def close(self):
+        """
+        Shut down the worker processes
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = WorkerPool(self, self._max_workers)
+            self._pool.open()
+        return self._pool
+
+    def _percentile_bands(self, label, replications):
+        times = list(replications[0])
+        lane_ids = list(replications[0][times[0]])
+        # queue length by replication, time and lane
+        queues = np.array([[[samples[time][lane_id] for lane_id in lane_ids]
+                            for time in times] for samples in replications])
+        queues = np.concatenate([queues, queues.sum(axis=2, keepdims=True)], axis=2)
+        bands = np.percentile(queues, self._percentiles, axis=0)
+
+        rows = []
+        for time_index, time in enumerate(times):
+            for lane_index, lane_id in enumerate(lane_ids + ['Total']):
+                rows.append([label, time, lane_id] +
+                            list(bands[:, time_index, lane_index]))
+        df_out = pd.DataFrame(data=rows, columns=self._column_names()[:-1])
+        df_out['Feasible'] = True
+        return df_out
+
+    def _infeasible(self, label):
+        row = [label, pd.NaT, None] + [np.nan] * len(self._percentiles) + [False]
+        return pd.DataFrame(data=[row], columns=self._column_names())
+
+    def _column_names(self):
+        return ['Action', 'Time', 'Lane'] + \
+            ['P' + format(percentile, 'g') for percentile in self._percentiles] + \
+            ['Feasible']
+
+    def __getstate__(self):
+        # worker processes receive the settings, not the pool
+        state = dict(self.__dict__)
+        state['_pool'] = None
+        return state
@@ -0,0 +1,266 @@
+"""
+Live Feed Service
+
+Runs a Facility alongside the plaza, ingesting transaction records as lane
+controllers report them and publishing per-lane queue estimates, all on a
+single asyncio event loop.
+"""
+import asyncio
+import datetime
+import heapq
+import json
+import time
+from toll_queue import Transaction
+
+
+class LiveFeedService:
+    """
+    Advances a Facility in step with wall-clock time, or accelerated time,
+    while transaction records arrive from streams. Records are JSON objects
+    with 'time' (ISO format, in the Facility's clock without a timezone),
+    'payment' and 'axles', and optionally 'lane' and 'trx_id'. Transactions are routed to the shortest eligible queue,
+    or with *replay* added to the lane in the record. Records are
+    held until the Facility time passes their 'time', so they may arrive
+    early or out of order.
+
+    A record the Facility cannot place when it is due, e.g. a payment type
+    with no open eligible lane or an unknown lane in replay, is counted as
+    rejected and skipped.
+
+    Estimates are published to subscriber queues. A subscriber queue keeps
+    only the most recent estimates, so a slow consumer never reads stale
+    data.
+
+    :param facility: Facility object to advance
+    :param time_scale: float simulated seconds per wall-clock second.
+        Default is 1, real time.
+    :param publish_interval: int simulated seconds between published
+        estimates. Default is 1.
+    :param replay: boolean, add transactions to the lane in the record
+    :param clock: function returning wall-clock seconds. Default is
+        time.monotonic.
+    """
+    _one_second = datetime.timedelta(seconds=1)
+
+    def __init__(self, facility, time_scale=1.0, publish_interval=1,
+                 replay=False, clock=time.monotonic):
+        if time_scale <= 0:
+            raise ValueError('time_scale must be positive')
+        if publish_interval < 1:
+            raise ValueError('publish_interval must be at least 1 second')
+        self._facility = facility
+        self._time_scale = float(time_scale)
+        self._publish_interval = int(publish_interval)
+        self._replay = replay
+        self._clock = clock
+        self._pending = []
+        self._record_counter = 0
+        self._subscribers = []
+        self._running = False
+        self._lag = 0.0
+        self._records_received = 0
+        self._records_rejected = 0
+
+    def add_record(self, record):
+        """
+        Queue a transaction record for the Facility
+
+        :param record: dictionary with 'time', 'payment', 'axles' and
+            optional 'lane' and 'trx_id' keys
+        :raises ValueError: invalid record, or a record time with a timezone
+        """
+        try:
+            record_time = record['time']
+            if not isinstance(record_time, datetime.datetime):
+                record_time = datetime.datetime.fromisoformat(record_time)
+            if record_time.utcoffset() is not None:
+                # the Facility clock has no timezone, so an offset cannot be placed on it
+                raise ValueError('record time has a timezone: ' + str(record_time))
+            transaction = Transaction(record_time, record['payment'],
+                                      int(record['axles']),
+                                      record.get('trx_id', self._record_counter))
+            lane_id = None
+            if self._replay:
+                lane_id = int(record['lane'])
+        except (KeyError, TypeError) as error:
+            raise ValueError('Invalid record: ' + str(error))
+        heapq.heappush(self._pending,
+                       (record_time, self._record_counter, transaction, lane_id))
+        self._record_counter += 1
+        self._records_received += 1
+
+    async def ingest(self, reader):
+        """
+        Read newline-delimited JSON records from a stream until it closes.
+        Invalid lines are skipped.
+
+        :param reader: asyncio.StreamReader
+        :returns: int number of records read
+        """
+        count = 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                return count
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self.add_record(json.loads(line))
+                count += 1
+            except ValueError:
+                continue
+
+    async def serve(self, host='127.0.0.1', port=0):
+        """
+        Accept lane controller connections and ingest their records
+
+        :param host: String host to listen on
+        :param port: int port. Default 0 picks a free port.
+        :returns: asyncio.Server
+        """
+        async def handle(reader, writer):
+            try:
+                await self.ingest(reader)
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+    def subscribe(self, maxsize=1):
+        """
+        :param maxsize: int number of most recent estimates kept
+        :returns: asyncio.Queue receiving published estimates
+        """
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def snapshot(self):
+        """
+        Current queue estimate
+
+        :returns: dictionary with 'time', 'lanes' (queue length by lane ID),
+            'wait_seconds' (wait time by lane ID), 'queue_length' (total),
+            'lag_seconds' (wall-clock seconds the simulation trails real
+            time), 'pending' (records waiting for their time) and
+            'rejected' (records the Facility could not place)
+        """
+        lanes = dict(self._facility.get_lane_queue())
+        wait_seconds = {lane_id: self._facility.get_lane(lane_id).get_wait_time().total_seconds()
+                        for lane_id in lanes}
+        return {
+            'time': self._facility.get_current_time(),
+            'lanes': lanes,
+            'wait_seconds': wait_seconds,
+            'queue_length': sum(lanes.values()),
+            'lag_seconds': self._lag,
+            'pending': len(self._pending),
+            'rejected': self._records_rejected,
+        }
+
+    def publish(self):
+        """
+        Send the current estimate to every subscriber, dropping the oldest
+        estimate of a full subscriber queue
+        """
+        estimate = self.snapshot()
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(estimate)
+
+    def step(self):
+        """
+        Add due records and advance the Facility one second. Records the
+        Facility cannot place are counted as rejected.
+        """
+        current_time = self._facility.get_current_time()
+        while self._pending and self._pending[0][0] < current_time:
+            _, _, transaction, lane_id = heapq.heappop(self._pending)
+            try:
+                if lane_id is None:
+                    self._facility.add_transaction(transaction)
+                else:
+                    self._facility.add_transaction_to_lane(transaction, lane_id)
+            except (TypeError, ValueError):
+                # no eligible lane, unknown lane or no processing time
+                self._records_rejected += 1
+        self._facility.advance_time_facility(self._one_second)
+
+    async def run(self, until=None):
+        """
+        Advance the Facility with the clock until *until* or stop is called.
+        When the loop falls behind it catches up in whole seconds before
+        publishing, so each estimate reflects the latest simulated second.
+
+        :param until: datetime.datetime simulated time to stop at. Default
+            runs until stop is called.
+        """
+        self._running = True
+        start_wall = self._clock()
+        start_time = self._facility.get_current_time()
+        steps = 0
+        while self._running:
+            target = (self._clock() - start_wall) * self._time_scale
+            if until is not None:
+                target = min(target, (until - start_time).total_seconds())
+            published = steps // self._publish_interval
+            while steps + 1 <= target:
+                self.step()
+                steps += 1
+            if steps // self._publish_interval > published:
+                self._lag = max(0.0, self._clock() - start_wall - steps / self._time_scale)
+                self.publish()
+            if until is not None and self._facility.get_current_time() >= until:
+                break
+            # sleep until the next simulated second is due
+            due = start_wall + (steps + 1) / self._time_scale
+            await asyncio.sleep(max(0.0, due - self._clock()))
+        self._running = False
+
+    def stop(self):
+        """
+        Stop run after the current step
+        """
+        self._running = False
+
+    def get_records_received(self):
+        """
+        :returns: int number of records received
+        """
+        return self._records_received
+
+    def get_records_rejected(self):
+        """
+        :returns: int number of records the Facility could not place
+        """
+        return self._records_rejected
+
+
+async def feed_dataframe(dataframe, writer, start_time, time_scale=1.0,
+                         clock=time.monotonic):
+    """
+    Local stand-in for lane controllers. Writes each transaction of a
+    dataframe to a stream as a JSON record when its time comes up.
+
+    :param dataframe: dataframe of transactions
+    :param writer: asyncio.StreamWriter
+    :param start_time: datetime.datetime simulated time at the first write
+    :param time_scale: float simulated seconds per wall-clock second
+    :param clock: function returning wall-clock seconds
+    """
+    start_wall = clock()
+    df_sorted = dataframe.sort_values('trans date/time', kind='stable')
+    for trx_id, row in zip(df_sorted.index, df_sorted.itertuples(index=False)):
+        record_time = row[0].to_pydatetime() if hasattr(row[0], 'to_pydatetime') else row[0]
+        due = start_wall + (record_time - start_time).total_seconds() / time_scale
+        delay = due - clock()
+        if delay > 0:
+            await writer.drain()
+            await asyncio.sleep(delay)
+        record = {'time': record_time.isoformat(), 'lane': int(row[1]),
+                  'payment': row[2], 'axles': int(row[3]), 'trx_id': int(trx_id)}
+        writer.write((json.dumps(record) + '\n').encode())
+    await writer.drain()
+    writer.close()
@@ -0,0 +1,326 @@
+"""
+Analytical Queue Screen
+
+Estimates queue length and wait per interval for a lane configuration
+without running the tick simulation, so obviously poor lane mixes can be
+ruled out before committing simulation time.
+"""
+import datetime
+import pandas as pd
+from toll_queue import ServiceTimeModel, Util
+
+
+class QueueScreen:
+    """
+    Multi-server (M/G/c) approximation of a Facility lane configuration.
+    Lanes are grouped into pools by lane type. Shortest-queue routing
+    balances the load between lanes, so in each interval arrivals with a
+    single eligible pool are assigned first and the remaining arrivals fill
+    their dedicated pool and the general pool to the same utilization. Each
+    pool is then evaluated per interval with the Allen-Cunneen
+    approximation, and any interval where a pool is overloaded carries a
+    fluid backlog into the next interval.
+
+    :param lane_list: list of (lane ID, lane type) tuples, as used to build
+        a Facility
+    :param interval: datetime.timedelta length of each estimation interval.
+        Default is 15 minutes.
+    :param service_time_model: ServiceTimeModel with the processing time
+        distributions. Default is the Lane processing time parameters.
+    """
+    _servers = None
+    _interval = None
+    _service_time_model = None
+
+    # lanes advance one transaction per one second tick, so a processing time
+    # is effectively rounded up to the next whole second
+    _tick = 1.0
+    # halvings of the utilization bracket when balancing pools
+    _bisection_steps = 50
+
+    def __init__(self, lane_list, interval=datetime.timedelta(minutes=15),
+                 service_time_model=None):
+        if not isinstance(interval, datetime.timedelta):
+            raise TypeError('invalid input type, must be datetime.timedelta')
+        if interval <= datetime.timedelta():
+            raise ValueError('interval must be positive')
+        self._interval = interval
+        if service_time_model is None:
+            service_time_model = ServiceTimeModel()
+        if not isinstance(service_time_model, ServiceTimeModel):
+            raise TypeError('input not ServiceTimeModel')
+        self._service_time_model = service_time_model
+        self._servers = {}
+        lane_types = Util().get_lane_types()
+        for lane_id, lane_type in lane_list:
+            if not isinstance(lane_id, int):
+                raise TypeError('input not int')
+            if lane_type not in lane_types:
+                raise ValueError('Invalid Value, does not match existing lane type')
+            self._servers[lane_type] = self._servers.get(lane_type, 0) + 1
+
+    def get_servers(self):
+        """
+        :returns: Dictionary object with lane count by lane type
+        """
+        return self._servers
+
+    def get_interval(self):
+        """
+        :returns: datetime.timedelta length of each estimation interval
+        """
+        return self._interval
+
+    def service_time_moments(self, pmt_type, lane_type):
+        """
+        Mean and variance of the effective processing time, in seconds, of a
+        payment type in a lane type. Axle adjustments are not included.
+
+        :param pmt_type: String payment type
+        :param lane_type: String lane type
+        :returns: tuple of (mean, variance) in seconds
+        :raises ValueError: no processing time for payment and lane type
+        """
+        distribution = self._service_time_model.get_distribution(
+            pmt_type, lane_type)
+        return distribution.get_mean() + self._tick / 2, \
+            distribution.get_variance() + self._tick ** 2 / 12
+
+    def eligible_pools(self, pmt_type):
+        """
+        :param pmt_type: String payment type
+        :returns: list of lane types able to process the payment type
+        :raises TypeError: No applicable lane to process trxn
+        """
+        pools = []
+        if pmt_type != 'GEN' and pmt_type in self._servers:
+            pools.append(pmt_type)
+        if 'GEN' in self._servers:
+            pools.append('GEN')
+        if not pools:
+            raise TypeError('No applicable lane to process trxn')
+        return pools
+
+    def arrival_rates(self, dataframe, start_time=None, end_time=None):
+        """
+        Arrival rate by payment type for each interval.
+
+        :param dataframe: dataframe of transactions with 'trans date/time'
+            and 'Payment' columns
+        :param start_time: datetime start of the first interval. Default is
+            the first transaction time rounded down to the interval.
+        :param end_time: datetime start of the last interval. Default is the
+            last transaction time rounded down to the interval.
+        :returns: dataframe of vehicles per second indexed by interval start
+            with one column per payment type
+        """
+        times = pd.to_datetime(dataframe['trans date/time'])
+        freq = pd.Timedelta(self._interval)
+        if start_time is None:
+            start_time = times.min().floor(freq)
+        if end_time is None:
+            end_time = times.max().floor(freq)
+        start_time = pd.Timestamp(start_time)
+        interval_number = (times - start_time) // freq
+        counts = pd.crosstab(interval_number, dataframe['Payment'])
+        n = int((pd.Timestamp(end_time) - start_time) // freq) + 1
+        counts = counts.reindex(range(n), fill_value=0)
+        counts.index = [start_time + i * freq for i in range(n)]
+        return counts / self._interval.total_seconds()
+
+    def estimate(self, dataframe, start_time=None, end_time=None):
+        """
+        Estimate facility queue length and wait for each interval.
+
+        :param dataframe: dataframe of transactions with 'trans date/time'
+            and 'Payment' columns
+        :param start_time: datetime start of the first interval
+        :param end_time: datetime start of the last interval
+        :returns: dataframe indexed by interval start with columns Arrivals,
+            Utilization, Queue_Length, Wait_Time_Seconds and Saturated
+        """
+        rates = self.arrival_rates(dataframe, start_time, end_time)
+        seconds = self._interval.total_seconds()
+        backlog = {pool: 0.0 for pool in self._servers}
+
+        rows = []
+        for interval_rates in rates.itertuples(index=False):
+            arrivals = 0.0
+            utilization = 0.0
+            queue_length = 0.0
+            total_wait = 0.0
+            saturated = False
+            pool_rates = self._pool_rates(dict(zip(rates.columns, interval_rates)))
+            for pool, servers in self._servers.items():
+                arrival_rate, mean, scv = self._pool_moments(
+                    pool, pool_rates[pool])
+                length, wait, rho, backlog[pool] = self._evaluate_pool(
+                    servers, arrival_rate, mean, scv, backlog[pool], seconds)
+                arrivals += arrival_rate * seconds
+                utilization = max(utilization, rho)
+                queue_length += length
+                total_wait += wait * arrival_rate * seconds
+                saturated = saturated or rho >= 1
+            wait_time = total_wait / arrivals if arrivals else 0.0
+            rows.append([arrivals, utilization, queue_length, wait_time,
+                         saturated])
+
+        column_names = ['Arrivals', 'Utilization', 'Queue_Length',
+                        'Wait_Time_Seconds', 'Saturated']
+        return pd.DataFrame(data=rows, index=rates.index, columns=column_names)
+
+    def compare_with_facility(self, facility, estimate, tolerance=0.25):
+        """
+        Compare an estimate with the queue summary of a simulated Facility.
+        Intervals where the estimate differs from the mean simulated queue by
+        more than the relative tolerance, and by at least one vehicle, are
+        flagged as diverging.
+
+        :param facility: Facility object that has been simulated
+        :param estimate: dataframe returned by estimate
+        :param tolerance: float relative difference for divergence
+        :returns: dataframe indexed by interval start with columns
+            Estimated_Queue_Length, Simulated_Queue_Length, Difference
+            and Diverges
+        """
+        summary = facility.get_queue_summary()
+        simulated = pd.Series([value[0] for value in summary.values()],
+                              index=pd.to_datetime(list(summary)),
+                              dtype=float)
+        freq = pd.Timedelta(self._interval)
+        simulated = simulated.groupby(simulated.index.floor(freq)).mean()
+
+        df_out = pd.DataFrame(index=estimate.index)
+        df_out['Estimated_Queue_Length'] = estimate['Queue_Length']
+        df_out['Simulated_Queue_Length'] = simulated.reindex(estimate.index)
+        df_out['Difference'] = df_out['Estimated_Queue_Length'] - \
+            df_out['Simulated_Queue_Length']
+        limit = (tolerance * df_out['Simulated_Queue_Length']).clip(lower=1)
+        df_out['Diverges'] = df_out['Difference'].abs() > limit
+        return df_out
+
+    def erlang_c(self, servers, offered_load):
+        """
+        Probability that an arriving vehicle has to wait in an M/M/c queue.
+
+        :param servers: int number of lanes
+        :param offered_load: float arrival rate times mean processing time
+        :returns: float probability of waiting
+        """
+        if offered_load >= servers:
+            return 1.0
+        erlang_b = 1.0
+        for k in range(1, servers + 1):
+            erlang_b = offered_load * erlang_b / (k + offered_load * erlang_b)
+        rho = offered_load / servers
+        return erlang_b / (1 - rho * (1 - erlang_b))
+
+    def _pool_split(self, rates):
+        """
+        Arrival rate of each payment type sent to each eligible pool.
+        Payment types with a single eligible pool are assigned to it, then
+        the others keep as much traffic in their dedicated pool as brings it
+        to the utilization of the general pool, found by bisection.
+
+        :param rates: dictionary of vehicles per second by payment type
+        :returns: dictionary of pool arrival rate dictionaries by payment type
+        """
+        split = {}
+        general_load = 0.0
+        flexible = []
+        for pmt_type, rate in rates.items():
+            pools = self.eligible_pools(pmt_type)
+            if len(pools) == 1:
+                split[pmt_type] = {pools[0]: rate}
+                if pools[0] == 'GEN':
+                    general_load += rate * self.service_time_moments(pmt_type, 'GEN')[0]
+            else:
+                flexible.append(pmt_type)
+        if not flexible:
+            return split
+
+        dedicated_mean = {pmt_type: self.service_time_moments(pmt_type, pmt_type)[0]
+                          for pmt_type in flexible}
+        general_mean = {pmt_type: self.service_time_moments(pmt_type, 'GEN')[0]
+                        for pmt_type in flexible}
+
+        def dedicated_rates(level):
+            # rate each dedicated pool takes to reach the utilization level
+            return {pmt_type: min(rates[pmt_type], level * self._servers[pmt_type] /
+                                  dedicated_mean[pmt_type]) for pmt_type in flexible}
+
+        def general_utilization(level):
+            load = general_load + sum((rates[pmt_type] - rate) * general_mean[pmt_type]
+                                      for pmt_type, rate in dedicated_rates(level).items())
+            return load / self._servers['GEN']
+
+        # utilization with all flexible traffic in the dedicated pools
+        low = 0.0
+        high = max(rates[pmt_type] * dedicated_mean[pmt_type] / self._servers[pmt_type]
+                   for pmt_type in flexible)
+        if general_utilization(high) < high:
+            for _ in range(self._bisection_steps):
+                level = (low + high) / 2
+                if general_utilization(level) > level:
+                    low = level
+                else:
+                    high = level
+        for pmt_type, rate in dedicated_rates(high).items():
+            split[pmt_type] = {pmt_type: rate, 'GEN': rates[pmt_type] - rate}
+        return split
+
+    def _pool_rates(self, rates):
+        pool_rates = {pool: [] for pool in self._servers}
+        for pmt_type, pmt_split in self._pool_split(rates).items():
+            for pool, rate in pmt_split.items():
+                pool_rates[pool].append((pmt_type, rate))
+        return pool_rates
+
+    def _pool_moments(self, pool, pool_rates):
+        """
+        Arrival rate, mean processing time and squared coefficient of
+        variation of the processing time mixture within a pool.
+        """
+        arrival_rate = sum(rate for _, rate in pool_rates)
+        if arrival_rate <= 0:
+            return 0.0, self._tick, 0.0
+        mean = 0.0
+        second_moment = 0.0
+        for pmt_type, rate in pool_rates:
+            weight = rate / arrival_rate
+            pmt_mean, pmt_variance = self.service_time_moments(pmt_type, pool)
+            mean += weight * pmt_mean
+            second_moment += weight * (pmt_variance + pmt_mean ** 2)
+        return arrival_rate, mean, second_moment / mean ** 2 - 1
+
+    def _evaluate_pool(self, servers, arrival_rate, mean, scv, backlog,
+                       seconds):
+        """
+        Queue length, wait, utilization and closing backlog for a single
+        pool over one interval.
+        """
+        offered_load = arrival_rate * mean
+        rho = offered_load / servers
+        service_rate = servers / mean
+
+        # steady-state component
+        queue_steady = 0.0
+        wait_steady = 0.0
+        if rho < 1:
+            probability_wait = self.erlang_c(servers, offered_load)
+            wait_steady = probability_wait * mean / (servers - offered_load) \
+                * (1 + scv) / 2
+            queue_steady = arrival_rate * wait_steady
+
+        # fluid component for vehicles carried over from overloaded intervals
+        net_rate = arrival_rate - service_rate
+        backlog_end = max(0.0, backlog + net_rate * seconds)
+        if backlog_end > 0 or net_rate >= 0:
+            backlog_mean = (backlog + backlog_end) / 2
+        else:
+            drain_seconds = backlog / -net_rate
+            backlog_mean = backlog * drain_seconds / 2 / seconds
+
+        queue_length = queue_steady + min(offered_load, servers) + backlog_mean
+        wait = wait_steady + backlog_mean / service_rate
+        return queue_length, wait, rho, backlog_end
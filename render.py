@@ -0,0 +1,173 @@
+"""
+Toll Queue Rendering
+
+Plotting and video export for simulation output. Kept separate from
+toll_queue so the simulation core imports without matplotlib. OpenCV is
+only needed, and imported, by write_video.
+"""
+import os
+import io
+import base64
+import html
+import numpy as np
+# figures draw on their own Agg canvas, so headless servers need no display
+# and importing this module leaves the pyplot backend of notebooks alone
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import matplotlib.dates as mdates
+from toll_queue import Util
+
+
+def plot_lane_queues(lane_list, lane_queue_dict, simulation_time, directory='.'):
+    """
+    Plot lane queues
+
+    :param lane_list: list of lanes
+    :param lane_queue_dict: dictionary of lanes and queue length
+    :param simulation_time: datetime object when data generated
+    :param directory: directory for the png file. Default is the working
+        directory.
+    :returns: String name of the png file
+    """
+    # get labels
+    labels = []
+    for lane in lane_list:
+        labels.append(int(lane[0]))
+
+    values = lane_queue_dict.values()
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.bar(labels, values)
+    ax.set_title('Plaza Queue   ' + str(simulation_time))
+    ax.set_ylim(0, 100)
+    ax.set_ylabel('Queue Length')
+    ax.set_xlabel('Lane Number')
+
+    # save fig
+    util = Util()
+    name = util.fmt_date(simulation_time.year) + util.fmt_date(simulation_time.month) + \
+        util.fmt_date(simulation_time.day) + 'T' + util.fmt_date(simulation_time.hour) + \
+        util.fmt_date(simulation_time.minute) + util.fmt_date(simulation_time.second) + \
+        '.png'
+    name = os.path.join(directory, name)
+    fig.savefig(name)
+    return name
+
+
+def write_video(directory='.', name='test.avi', fps=30, width=640, height=480,
+                remove_images=True):
+    """
+    Combine the png files in a directory, in name order, into a video file
+
+    :param directory: directory with png files
+    :param name: video file name, written to the directory
+    :param fps: frames per second
+    :param width: frame width in pixels
+    :param height: frame height in pixels
+    :param remove_images: boolean, delete the png files afterwards
+    :returns: String path of the video file
+    """
+    import cv2
+    path = os.path.join(directory, name)
+    fourcc = cv2.VideoWriter_fourcc(*'MP42')
+    video = cv2.VideoWriter(path, fourcc, float(fps), (width, height))
+
+    img_files = sorted(file_name for file_name in os.listdir(directory)
+                       if file_name.endswith('.png'))
+    for file_name in img_files:
+        img = cv2.imread(os.path.join(directory, file_name))
+        video.write(img)
+    video.release()
+
+    if remove_images:
+        for file_name in img_files:
+            os.remove(os.path.join(directory, file_name))
+    return path
+
+
+def write_report(facility, name='queue_report.png', directory='.', bin_seconds=None):
+    """
+    Single-page queue report of a simulation: a lane by time heatmap of
+    queue length above time series of the facility queue length and wait
+    time. Written as a png, or as an html page with the chart and a table
+    of peak queues by lane when *name* ends in .html.
+
+    :param facility: simulated Facility object
+    :param name: report file name, written to the directory
+    :param directory: directory for the report file
+    :param bin_seconds: int seconds per heatmap column, each showing the
+        longest queue in its period. Default fits about 1,440 columns.
+    :returns: String path of the report file
+    """
+    lane_summary = facility.get_lane_queue_summary()
+    queue_summary = facility.get_queue_summary()
+    if not lane_summary:
+        raise ValueError('facility has no queue summary, run it first')
+    times = list(lane_summary)
+    # lanes are never removed, so the last summary has every lane
+    lane_ids = list(lane_summary[times[-1]])
+    queues = np.array([[lanes.get(lane_id, 0) for lane_id in lane_ids]
+                       for lanes in lane_summary.values()], dtype=float)
+    totals = np.array([value[0] for value in queue_summary.values()], dtype=float)
+    waits = np.array([value[1].total_seconds() for value in queue_summary.values()])
+
+    # bin columns to the maximum queue in each period
+    if bin_seconds is None:
+        bin_seconds = max(1, len(times) // 1440)
+    columns = -(-len(times) // bin_seconds)
+    padded = np.zeros((columns * bin_seconds, len(lane_ids)))
+    padded[:len(times)] = queues
+    heatmap = padded.reshape(columns, bin_seconds, len(lane_ids)).max(axis=1).T
+
+    start, end = mdates.date2num(times[0]), mdates.date2num(times[-1])
+    fig = Figure(figsize=(12, 9))
+    FigureCanvasAgg(fig)
+    ax_heatmap, ax_queue, ax_wait = fig.subplots(
+        3, 1, sharex=True, gridspec_kw={'height_ratios': [2, 1, 1]})
+    image = ax_heatmap.imshow(heatmap, aspect='auto', interpolation='nearest',
+                              cmap='viridis', origin='lower',
+                              extent=(start, end, -0.5, len(lane_ids) - 0.5))
+    ax_heatmap.set_yticks(range(len(lane_ids)))
+    ax_heatmap.set_yticklabels([str(lane_id) for lane_id in lane_ids])
+    ax_heatmap.set_ylabel('Lane Number')
+    ax_heatmap.set_title('Plaza Queue   ' + str(times[0]) + ' to ' + str(times[-1]))
+    # inset colorbar, so the heatmap keeps the width of the time series
+    fig.colorbar(image, cax=ax_heatmap.inset_axes([1.01, 0, 0.015, 1]),
+                 label='Queue Length')
+
+    time_numbers = mdates.date2num(times)
+    ax_queue.plot(time_numbers, totals, linewidth=0.5)
+    ax_queue.set_ylabel('Queue Length')
+    ax_wait.plot(time_numbers, waits, linewidth=0.5, color='tab:orange')
+    ax_wait.set_ylabel('Total Wait (s)')
+    ax_wait.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+    ax_wait.set_xlabel('Time')
+
+    path = os.path.join(directory, name)
+    if not name.endswith('.html'):
+        fig.savefig(path, dpi=100)
+        return path
+
+    image_buffer = io.BytesIO()
+    fig.savefig(image_buffer, format='png', dpi=100)
+    rows = []
+    for index, lane_id in enumerate(lane_ids):
+        peak = int(np.argmax(queues[:, index]))
+        rows.append('<tr><td>' + html.escape(str(lane_id)) + '</td><td>' +
+                    str(int(queues[peak, index])) + '</td><td>' + str(times[peak]) +
+                    '</td><td>' + format(queues[:, index].mean(), '.2f') + '</td></tr>')
+    peak = int(np.argmax(totals))
+    rows.append('<tr><td>Total</td><td>' + str(int(totals[peak])) + '</td><td>' +
+                str(times[peak]) + '</td><td>' + format(totals.mean(), '.2f') +
+                '</td></tr>')
+    with open(path, 'w') as report:
+        report.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+                     '<title>Plaza Queue Report</title></head><body>\n'
+                     '<h1>Plaza Queue Report</h1>\n<img src="data:image/png;base64,' +
+                     base64.b64encode(image_buffer.getvalue()).decode() + '">\n'
+                     '<table border="1"><tr><th>Lane</th><th>Peak Queue</th>'
+                     '<th>Peak Time</th><th>Mean Queue</th></tr>\n' +
+                     '\n'.join(rows) + '\n</table>\n</body></html>\n')
+    return path
@@ -0,0 +1,127 @@
+"""
+Historical Lane Replay
+
+Replays transactions into the lanes recorded in the input data and compares
+the resulting queues with shortest-queue routing of the same transactions.
+"""
+import datetime
+import pandas as pd
+from toll_queue import Facility, Lane, Util
+
+
+class ReplayComparison:
+    """
+    Runs the same transactions through two Facilities with the same lanes.
+    The replay Facility assigns each transaction to its recorded 'Lane',
+    the routed Facility uses Facility.add_transaction.
+
+    :param lane_list: list of (lane ID, lane type) tuples. Lane IDs must
+        include every lane recorded in the data.
+    :param start_time: datetime.datetime start of the simulation
+    :param service_time_model: ServiceTimeModel used by both Facilities.
+        Default is the Lane processing time parameters.
+    """
+    _lane_list = None
+    _start_time = None
+    _service_time_model = None
+    _replay_facility = None
+    _routed_facility = None
+
+    def __init__(self, lane_list, start_time, service_time_model=None):
+        if not isinstance(start_time, datetime.datetime):
+            raise TypeError('invalid input type, must be datetime.datetime')
+        self._lane_list = list(lane_list)
+        self._start_time = start_time
+        self._service_time_model = service_time_model
+
+    def create_facility(self):
+        """
+        :returns: Facility with the configured lanes
+        """
+        facility = Facility(self._start_time)
+        for lane_id, lane_type in self._lane_list:
+            facility.add_lane(Lane(lane_id, lane_type))
+        if self._service_time_model is not None:
+            facility.set_service_time_model(self._service_time_model)
+        return facility
+
+    def run(self, dataframe, seconds=60 * 60 * 24):
+        """
+        Simulate replayed and routed Facilities.
+
+        :param dataframe: dataframe of transactions with a 'Lane' column
+        :param seconds: int number of seconds to simulate. Default is one day.
+        :returns: dataframe of queue traces, see get_trace
+        """
+        recorded_lanes = set(int(lane_id) for lane_id in dataframe['Lane'].unique())
+        missing_lanes = recorded_lanes - set(lane[0] for lane in self._lane_list)
+        if missing_lanes:
+            raise ValueError('Recorded lanes missing from lane list: ' +
+                             str(sorted(missing_lanes)))
+
+        self._replay_facility = self.create_facility()
+        self._routed_facility = self.create_facility()
+        Util().run_facility(self._replay_facility, dataframe, seconds, replay=True)
+        Util().run_facility(self._routed_facility, dataframe, seconds)
+        return self.get_trace()
+
+    def get_replay_facility(self):
+        """
+        :returns: Facility with transactions in their recorded lanes
+        """
+        return self._replay_facility
+
+    def get_routed_facility(self):
+        """
+        :returns: Facility with transactions in the shortest eligible queue
+        """
+        return self._routed_facility
+
+    def get_trace(self):
+        """
+        Queue length by lane and in total for each second of both runs.
+
+        :returns: dataframe indexed by datetime with Replay_Lane_<id> and
+            Routed_Lane_<id> columns per lane, Replay_Total, Routed_Total and
+            Difference (replay minus routed)
+        """
+        if self._replay_facility is None:
+            raise ValueError('Comparison has not been run')
+        replay = self._lane_trace(self._replay_facility, 'Replay')
+        routed = self._lane_trace(self._routed_facility, 'Routed')
+        df_out = pd.concat([replay, routed], axis=1)
+        df_out['Replay_Total'] = replay.sum(axis=1)
+        df_out['Routed_Total'] = routed.sum(axis=1)
+        df_out['Difference'] = df_out['Replay_Total'] - df_out['Routed_Total']
+        return df_out
+
+    def summary(self):
+        """
+        Summary statistics of the queue traces by lane.
+
+        :returns: dataframe indexed by lane ID, with 'Total' for the
+            Facility, with mean and maximum replay and routed queue lengths
+            and the mean absolute difference
+        """
+        trace = self.get_trace()
+        rows = []
+        index = [lane[0] for lane in self._lane_list] + ['Total']
+        for lane_id in index:
+            if lane_id == 'Total':
+                replay = trace['Replay_Total']
+                routed = trace['Routed_Total']
+            else:
+                replay = trace['Replay_Lane_' + str(lane_id)]
+                routed = trace['Routed_Lane_' + str(lane_id)]
+            rows.append([replay.mean(), replay.max(), routed.mean(),
+                         routed.max(), (replay - routed).abs().mean()])
+        column_names = ['Replay_Mean', 'Replay_Max', 'Routed_Mean',
+                        'Routed_Max', 'Mean_Absolute_Difference']
+        return pd.DataFrame(data=rows, index=index, columns=column_names)
+
+    def _lane_trace(self, facility, prefix):
+        df_out = pd.DataFrame.from_dict(facility.get_lane_queue_summary(),
+                                        orient='index')
+        df_out.columns = [prefix + '_Lane_' + str(lane_id)
+                          for lane_id in df_out.columns]
+        return df_out
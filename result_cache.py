@@ -0,0 +1,174 @@
+"""
+Simulation Result Cache
+
+Stores queue summaries of simulation runs on disk, keyed by a hash of
+everything that determines the result, so repeated scenarios are read back
+instead of simulated again.
+"""
+import os
+import datetime
+import hashlib
+import pickle
+import pandas as pd
+import toll_queue
+from toll_queue import Facility, Lane, ServiceTimeModel, Util
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of Facility queue summaries. The key is
+    a hash of the transactions, lane configuration, processing time model,
+    seed, simulated period and simulator code version. When the cache grows
+    beyond *max_bytes* the least recently used results are removed.
+
+    :param directory: cache directory, created if missing
+    :param max_bytes: int maximum total size of cached results in bytes.
+        Default is 256 MB.
+    :param code_version: String included in every key. Default is a hash of
+        the toll_queue source, so results are not reused after code changes.
+    """
+    _directory = None
+    _max_bytes = None
+    _code_version = None
+    _extension = '.pkl'
+
+    def __init__(self, directory='.toll_queue_cache', max_bytes=256 * 2 ** 20,
+                 code_version=None):
+        if max_bytes <= 0:
+            raise ValueError('max_bytes must be positive')
+        if code_version is None:
+            with open(toll_queue.__file__, 'rb') as source:
+                code_version = hashlib.sha256(source.read()).hexdigest()
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._code_version = code_version
+
+    def key(self, lane_list, dataframe, start_time, seconds, service_time_model):
+        """
+        :param lane_list: list of (lane ID, lane type) tuples
+        :param dataframe: dataframe of transactions
+        :param start_time: datetime.datetime start of the simulation
+        :param seconds: int number of seconds simulated
+        :param service_time_model: ServiceTimeModel, including its seed
+        :returns: String hex digest identifying the run
+        """
+        digest = hashlib.sha256()
+        digest.update(pd.util.hash_pandas_object(dataframe, index=True).values.tobytes())
+        digest.update(repr(list(dataframe.columns)).encode())
+        digest.update(repr([tuple(lane) for lane in lane_list]).encode())
+        digest.update(repr(start_time).encode())
+        digest.update(repr(seconds).encode())
+        digest.update(repr(service_time_model).encode())
+        digest.update(self._code_version.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        :param key: String key
+        :returns: cached queue summary dataframe, or None when not cached
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cached:
+                result = pickle.load(cached)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        # mark as recently used for eviction
+        os.utime(path)
+        return result
+
+    def put(self, key, result):
+        """
+        Store a result, then evict least recently used results above the
+        size limit.
+
+        :param key: String key
+        :param result: queue summary dataframe
+        """
+        path = self._path(key)
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as cached:
+            pickle.dump(result, cached, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def run(self, lane_list, dataframe, start_time, seconds=60 * 60 * 24,
+            seed=None, service_time_model=None):
+        """
+        Return the queue summary of a run from the cache, simulating and
+        storing it when not cached. A seed is required so the cached result
+        is the result the run would produce.
+
+        :param lane_list: list of (lane ID, lane type) tuples
+        :param dataframe: dataframe of transactions
+        :param start_time: datetime.datetime start of the simulation
+        :param seconds: int number of seconds to simulate. Default is one day.
+        :param seed: int common random numbers seed. Default is the seed of
+            the service time model.
+        :param service_time_model: ServiceTimeModel. Default is the Lane
+            processing time parameters.
+        :returns: queue summary dataframe, see
+            Facility.get_queue_summary_dataframe
+        """
+        if not isinstance(start_time, datetime.datetime):
+            raise TypeError('invalid input type, must be datetime.datetime')
+        if service_time_model is None:
+            service_time_model = ServiceTimeModel()
+        if seed is not None:
+            service_time_model = service_time_model.copy()
+            service_time_model.set_common_random_numbers(
+                seed, service_time_model.get_common_random_numbers()[1])
+        if service_time_model.get_common_random_numbers()[0] is None:
+            raise ValueError('cached runs require a seed')
+
+        key = self.key(lane_list, dataframe, start_time, seconds, service_time_model)
+        result = self.get(key)
+        if result is not None:
+            return result
+
+        facility = Facility(start_time)
+        for lane_id, lane_type in lane_list:
+            facility.add_lane(Lane(lane_id, lane_type))
+        facility.set_service_time_model(service_time_model)
+        Util().run_facility(facility, dataframe, seconds)
+        result = facility.get_queue_summary_dataframe()
+        self.put(key, result)
+        return result
+
+    def evict(self):
+        """
+        Remove least recently used results until the cache is within its
+        size limit
+        """
+        entries = []
+        for name in os.listdir(self._directory):
+            if name.endswith(self._extension):
+                stat = os.stat(os.path.join(self._directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        total_bytes = sum(entry[1] for entry in entries)
+        for _, size, name in entries:
+            if total_bytes <= self._max_bytes:
+                break
+            os.remove(os.path.join(self._directory, name))
+            total_bytes -= size
+
+    def clear(self):
+        """
+        Remove all cached results
+        """
+        for name in os.listdir(self._directory):
+            if name.endswith(self._extension):
+                os.remove(os.path.join(self._directory, name))
+
+    def get_size(self):
+        """
+        :returns: int total size of cached results in bytes
+        """
+        return sum(os.path.getsize(os.path.join(self._directory, name))
+                   for name in os.listdir(self._directory)
+                   if name.endswith(self._extension))
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + self._extension)
@@ -0,0 +1,214 @@
+"""
+Replication Study
+
+Runs Facility replications in parallel batches until confidence intervals
+on the chosen metrics reach the requested precision.
+"""
+import os
+import datetime
+import math
+import numpy as np
+import pandas as pd
+from toll_queue import Facility, Lane, ServiceTimeModel, Util
+from worker_pool import WorkerPool
+
+
+# two-sided Student t critical values by confidence level, for 1 to 30
+# degrees of freedom, with the normal value used beyond 30
+_T_CRITICAL = {
+    0.90: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833,
+           1.812, 1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734,
+           1.729, 1.725, 1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703,
+           1.701, 1.699, 1.697, 1.645],
+    0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262,
+           2.228, 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101,
+           2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052,
+           2.048, 2.045, 2.042, 1.960],
+    0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250,
+           3.169, 3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878,
+           2.861, 2.845, 2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771,
+           2.763, 2.756, 2.750, 2.576],
+}
+
+class ReplicationStudy:
+    """
+    Replicates a Facility simulation with a different processing time seed
+    per replication. Replications run in batches across a process pool and
+    the study stops once every metric's confidence interval half-width is
+    within its precision target.
+
+    Available metrics are 'peak_queue' (maximum vehicles in the facility),
+    'p95_wait' (95th percentile vehicle wait in seconds) and
+    'vehicle_seconds_delay' (total wait of all vehicles in seconds). A
+    vehicle waits from its arrival until its processing starts, and
+    vehicles still queued at the end count with their wait so far.
+
+    :param lane_list: list of (lane ID, lane type) tuples
+    :param dataframe: dataframe of transactions
+    :param start_time: datetime.datetime start of the simulation
+    :param seconds: int number of seconds to simulate. Default is one day.
+    :param metrics: list of metric names. Default is all metrics.
+    :param relative_precision: float target half-width as a fraction of the
+        mean, for metrics without an absolute target. Default is 0.05.
+    :param precision: dictionary of absolute half-width targets by metric
+    :param confidence: confidence level, 0.90, 0.95 or 0.99
+    :param batch_size: int replications per batch. Default is the number of
+        workers.
+    :param min_replications: int replications before stopping is considered
+    :param max_replications: int replications after which the study stops
+    :param max_workers: int worker processes. 1 runs in this process.
+        Default is the number of CPUs.
+    :param seed: int seed of the first replication
+    :param antithetic: boolean, each replication is the mean of a run and
+        its antithetic run
+    :param service_time_model: ServiceTimeModel with the distributions to
+        use. Its seed is replaced in each replication.
+    """
+    _metric_names = ['peak_queue', 'p95_wait', 'vehicle_seconds_delay']
+
+    def __init__(self, lane_list, dataframe, start_time, seconds=60 * 60 * 24,
+                 metrics=None, relative_precision=0.05, precision=None,
+                 confidence=0.95, batch_size=None, min_replications=4,
+                 max_replications=100, max_workers=None, seed=0,
+                 antithetic=False, service_time_model=None):
+        if not isinstance(start_time, datetime.datetime):
+            raise TypeError('invalid input type, must be datetime.datetime')
+        if metrics is None:
+            metrics = list(self._metric_names)
+        for metric in metrics:
+            if metric not in self._metric_names:
+                raise ValueError('Unknown metric ' + str(metric))
+        if confidence not in _T_CRITICAL:
+            raise ValueError('confidence must be one of ' + str(sorted(_T_CRITICAL)))
+        if min_replications < 2:
+            raise ValueError('at least 2 replications required')
+        if service_time_model is None:
+            service_time_model = ServiceTimeModel()
+
+        self._lane_list = list(lane_list)
+        self._dataframe = dataframe
+        self._start_time = start_time
+        self._seconds = seconds
+        self._metrics = list(metrics)
+        self._relative_precision = relative_precision
+        self._precision = dict(precision or {})
+        self._confidence = confidence
+        self._batch_size = batch_size
+        self._min_replications = min_replications
+        self._max_replications = max_replications
+        self._max_workers = max_workers
+        self._seed = seed
+        self._antithetic = antithetic
+        self._service_time_model = service_time_model
+        self._results = []
+
+    def run(self):
+        """
+        Run replications until the precision targets or the maximum number
+        of replications are reached.
+
+        :returns: dataframe of confidence intervals, see summary
+        """
+        self._results = []
+        with WorkerPool(self, self._max_workers) as pool:
+            self._run_batches(pool)
+        return self.summary()
+
+    def run_replication(self, replication):
+        """
+        Simulate a single replication.
+
+        :param replication: int replication number
+        :returns: dictionary of metric values
+        """
+        seed = self._seed + replication
+        values = self._simulate(self._replication_model(seed, False))
+        if self._antithetic:
+            antithetic_values = self._simulate(self._replication_model(seed, True))
+            values = {metric: (values[metric] + antithetic_values[metric]) / 2
+                      for metric in values}
+        return values
+
+    def get_results(self):
+        """
+        :returns: dataframe of metric values, one row per replication
+        """
+        return pd.DataFrame(self._results, columns=self._metrics)
+
+    def summary(self):
+        """
+        Confidence intervals of the metrics over completed replications.
+
+        :returns: dataframe indexed by metric with columns Mean, Half_Width,
+            Target, Replications and Converged
+        """
+        results = self.get_results()
+        rows = []
+        for metric in self._metrics:
+            mean, half_width = self.confidence_interval(results[metric].values)
+            target = self._target(metric, mean)
+            rows.append([mean, half_width, target, results.shape[0],
+                         half_width <= target])
+        column_names = ['Mean', 'Half_Width', 'Target', 'Replications', 'Converged']
+        return pd.DataFrame(data=rows, index=self._metrics, columns=column_names)
+
+    def confidence_interval(self, values):
+        """
+        :param values: numpy array of replication values
+        :returns: tuple of (mean, half-width) of the confidence interval
+        """
+        n = len(values)
+        if n < 2:
+            return (float(np.mean(values)) if n else math.nan), math.inf
+        t_values = _T_CRITICAL[self._confidence]
+        t_value = t_values[min(n - 1, len(t_values)) - 1]
+        half_width = t_value * np.std(values, ddof=1) / math.sqrt(n)
+        return float(np.mean(values)), float(half_width)
+
+    def is_converged(self):
+        """
+        :returns: boolean, every metric within its precision target after
+            the minimum number of replications
+        """
+        if len(self._results) < self._min_replications:
+            return False
+        return bool(self.summary()['Converged'].all())
+
+    def _run_batches(self, pool):
+        batch_size = self._batch_size
+        if batch_size is None:
+            batch_size = 1 if self._max_workers == 1 else self._max_workers or os.cpu_count()
+        while len(self._results) < self._max_replications:
+            first = len(self._results)
+            last = min(first + batch_size, self._max_replications)
+            batch = pool.map('run_replication', range(first, last))
+            self._results.extend(batch)
+            if self.is_converged():
+                break
+
+    def _replication_model(self, seed, antithetic):
+        model = self._service_time_model.copy()
+        model.set_common_random_numbers(seed, antithetic)
+        return model
+
+    def _simulate(self, service_time_model):
+        facility = Facility(self._start_time)
+        for lane_id, lane_type in self._lane_list:
+            facility.add_lane(Lane(lane_id, lane_type))
+        facility.set_service_time_model(service_time_model)
+        Util().run_facility(facility, self._dataframe, self._seconds)
+
+        queue_lengths = [value[0] for value in facility.get_queue_summary().values()]
+        waits = np.array([wait.total_seconds() for wait in
+                          facility.get_wait_times() + facility.get_queued_wait_times()])
+        values = {
+            'peak_queue': max(queue_lengths) if queue_lengths else 0,
+            'p95_wait': float(np.percentile(waits, 95)) if waits.size else 0.0,
+            'vehicle_seconds_delay': float(waits.sum()),
+        }
+        return {metric: values[metric] for metric in self._metrics}
+
+    def _target(self, metric, mean):
+        if metric in self._precision:
+            return self._precision[metric]
+        return self._relative_precision * abs(mean)
@@ -0,0 +1,101 @@
+import os
+import datetime
+import pandas as pd
+import pytest
+import batch
+
+
+class Constants():
+    """
+    Constant class with variables used for testing
+    """
+    lane_list = [(1, 'GEN'), (2, 'GEN')]
+
+
+def write_day(directory, name, start_time, count=20):
+    """:returns: path of a csv file of cash transactions ten seconds apart"""
+    times = [start_time + datetime.timedelta(seconds=i * 10) for i in range(count)]
+    path = os.path.join(directory, name)
+    pd.DataFrame({'trans date/time': times, 'Lane': 1, 'Payment': 'CASH',
+                  'Axles': 2}).to_csv(path, index=False)
+    return path
+
+
+class Test_BatchRun():
+    """Validate multi-day batch runner"""
+
+    def test_start_time(self, tmp_path):
+        """Validate start time from file name or first transaction"""
+        runner = batch.BatchRun(Constants.lane_list)
+        df = pd.DataFrame({'trans date/time': [pd.Timestamp('2019-05-06 07:30')]})
+        assert runner.start_time('data/20190504.csv', df) == datetime.datetime(2019, 5, 4)
+        assert runner.start_time('data/plaza_a.csv', df) == datetime.datetime(2019, 5, 6)
+        assert runner.start_time('data/20191399.csv', df) == datetime.datetime(2019, 5, 6)
+
+    def test_run_directory(self, tmp_path):
+        """Validate each day is written to its own directory and summarised"""
+        data = tmp_path / 'data'
+        data.mkdir()
+        write_day(str(data), '20190504.csv', datetime.datetime(2019, 5, 4))
+        write_day(str(data), '20190505.csv', datetime.datetime(2019, 5, 5, 6), count=30)
+        output = str(tmp_path / 'output')
+        runner = batch.BatchRun(Constants.lane_list, output_directory=output,
+                                seconds=600, max_workers=2, seed=1)
+        summary = runner.run(str(data))
+        assert list(summary.index) == ['20190504', '20190505']
+        assert list(summary['Transactions']) == [20, 30]
+        assert list(summary['Error']) == ['', '']
+        assert summary.loc['20190505', 'Start_Time'] == datetime.datetime(2019, 5, 5)
+        assert os.path.exists(os.path.join(output, 'batch_summary.csv'))
+        for name in summary.index:
+            assert sorted(os.listdir(os.path.join(output, name))) == \
+                ['lane_queue_summary.csv', 'queue_summary.csv', 'rolling_summary.csv']
+
+    def test_same_result_in_process(self, tmp_path):
+        """Validate worker processes match a run in this process"""
+        path = write_day(str(tmp_path), '20190504.csv', datetime.datetime(2019, 5, 4))
+        in_process = batch.BatchRun(Constants.lane_list, str(tmp_path / 'a'),
+                                    seconds=300, max_workers=1, seed=3).run(path)
+        workers = batch.BatchRun(Constants.lane_list, str(tmp_path / 'b'),
+                                 seconds=300, max_workers=2, seed=3).run(path)
+        pd.testing.assert_frame_equal(in_process, workers)
+
+    def test_failed_day(self, tmp_path):
+        """Validate a failing day is reported without stopping the batch"""
+        write_day(str(tmp_path), '20190504.csv', datetime.datetime(2019, 5, 4))
+        with open(str(tmp_path / '20190505.csv'), 'w') as bad_file:
+            bad_file.write('time,lane\n')
+        summary = batch.BatchRun(Constants.lane_list, str(tmp_path / 'output'),
+                                 seconds=60, max_workers=1).run(str(tmp_path / '*.csv'))
+        assert summary.loc['20190504', 'Error'] == ''
+        assert summary.loc['20190505', 'Error'].startswith('KeyError')
+
+    def test_no_seconds(self):
+        """Validate ValueError for less than one simulated second per day"""
+        with pytest.raises(ValueError):
+            batch.BatchRun(Constants.lane_list, seconds=0)
+
+    def test_duplicate_names(self, tmp_path):
+        """Validate ValueError when days in different directories share a name"""
+        for plaza in ['plaza_a', 'plaza_b']:
+            (tmp_path / plaza).mkdir()
+            write_day(str(tmp_path / plaza), '20190504.csv', datetime.datetime(2019, 5, 4))
+        output = tmp_path / 'output'
+        with pytest.raises(ValueError):
+            batch.BatchRun(Constants.lane_list, str(output), seconds=60,
+                           max_workers=1).run(str(tmp_path / '*' / '*.csv'))
+        assert not output.exists()
+
+    def test_parse_lane_list(self):
+        """Validate lane list from the command line option"""
+        assert batch.parse_lane_list('1:GEN, 2:gen,7:ETC') == \
+            [(1, 'GEN'), (2, 'GEN'), (7, 'ETC')]
+        with pytest.raises(ValueError):
+            batch.parse_lane_list('1:GEN,2')
+        with pytest.raises(ValueError):
+            batch.parse_lane_list('1:XX')
+
+    def test_no_files(self, tmp_path):
+        """Validate ValueError when no files match"""
+        with pytest.raises(ValueError):
+            batch.BatchRun(Constants.lane_list).run(str(tmp_path / '*.csv'))
@@ -0,0 +1,98 @@
+import datetime
+import pandas as pd
+import pytest
+import toll_queue
+import capacity
+
+
+class Constants():
+    """
+    Constant class with variables used for testing
+    """
+    datetime_midnight = datetime.datetime(2020, 1, 1)
+    lane_list = [(1, 'GEN')]
+
+
+def create_arrivals(count, spacing):
+    """:returns: dataframe of cash transactions evenly spaced in seconds"""
+    times = [Constants.datetime_midnight + datetime.timedelta(seconds=i * spacing)
+             for i in range(count)]
+    return pd.DataFrame({'trans date/time': times, 'Lane': 1,
+                         'Payment': 'CASH', 'Axles': 2})
+
+
+def create_search(**kwargs):
+    """:returns: CapacitySearch of an hour of arrivals with 10 second cash service"""
+    model = toll_queue.ServiceTimeModel(
+        {('CASH', 'GEN'): toll_queue.NormalDistribution(10, 0)})
+    return capacity.CapacitySearch(create_arrivals(240, 15), Constants.datetime_midnight,
+                                   service_time_model=model, **kwargs)
+
+
+class Test_ScaleArrivals():
+    """Validate demand scaling by thinning and replication"""
+
+    def test_scaled_count(self):
+        """Validate scaled arrival count is close to the multiplier"""
+        df = create_arrivals(1000, 1)
+        assert capacity.scale_arrivals(df, 1).shape[0] == 1000
+        assert abs(capacity.scale_arrivals(df, 0.5).shape[0] - 500) < 60
+        assert abs(capacity.scale_arrivals(df, 2.5).shape[0] - 2500) < 60
+
+    def test_nested(self):
+        """Validate higher multipliers keep every arrival of lower ones"""
+        df = create_arrivals(500, 1)
+        lower = capacity.scale_arrivals(df, 1.3)
+        higher = capacity.scale_arrivals(df, 1.7)
+        assert set(lower.index) <= set(higher.index)
+        pd.testing.assert_series_equal(lower['trans date/time'],
+                                       higher.loc[lower.index, 'trans date/time'])
+        assert higher['trans date/time'].is_monotonic_increasing
+
+
+class Test_CapacitySearch():
+    """Validate capacity breaking-point search"""
+
+    def test_keeps_up(self):
+        """Validate light demand drains and heavy demand stops early"""
+        capacity_search = create_search(max_workers=1)
+        drained, seconds = capacity_search.keeps_up(Constants.lane_list, 1)
+        assert drained
+        assert seconds < 3600 + 60
+        drained, seconds = capacity_search.keeps_up(Constants.lane_list, 3)
+        assert not drained
+        assert seconds < 3600
+
+    def test_search(self):
+        """Validate breaking point is bracketed within tolerance"""
+        capacity_search = create_search(max_workers=1, tolerance=0.05)
+        result = capacity_search.search(Constants.lane_list)
+        # one lane serves 360 vehicles an hour against 240 arriving
+        assert 1.3 < result['Breaking_Point'] < result['Failing_Multiplier'] < 2
+        assert result['Failing_Multiplier'] - result['Breaking_Point'] <= \
+            0.05 * result['Failing_Multiplier']
+        assert result['Screen_Estimate'] == pytest.approx(1.43, abs=0.05)
+        assert not capacity_search.keeps_up(Constants.lane_list,
+                                            result['Failing_Multiplier'])[0]
+
+    def test_search_evaluates_once(self, monkeypatch):
+        """Validate no multiplier is simulated twice when the bracket moves down"""
+        capacity_search = create_search(max_workers=1, tolerance=0.05)
+        multipliers = []
+
+        def keeps_up(lane_list, multiplier):
+            multipliers.append(multiplier)
+            return multiplier < 0.5, 60
+
+        monkeypatch.setattr(capacity_search, 'keeps_up', keeps_up)
+        result = capacity_search.search(Constants.lane_list)
+        assert len(multipliers) == len(set(multipliers)) == result['Evaluations']
+        assert result['Breaking_Point'] < 0.5 <= result['Failing_Multiplier']
+
+    def test_search_all(self):
+        """Validate configurations searched in worker processes"""
+        capacity_search = create_search(max_workers=2, tolerance=0.1)
+        table = capacity_search.search_all({'one': [(1, 'GEN')],
+                                            'two': [(1, 'GEN'), (2, 'GEN')]})
+        assert list(table.index) == ['one', 'two']
+        assert table.loc['two', 'Breaking_Point'] > table.loc['one', 'Failing_Multiplier']
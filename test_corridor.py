@@ -0,0 +1,103 @@
+import datetime
+import pandas as pd
+import pytest
+import toll_queue
+import corridor
+
+
+class Constants():
+    """
+    Constant class with variables used for testing
+    """
+    datetime_midnight = datetime.datetime(2020, 1, 1)
+    travel_time = datetime.timedelta(seconds=30)
+
+
+def create_facility(lane_count=1, seed=None):
+    """:returns: Facility starting at midnight with GEN lanes"""
+    facility = toll_queue.Facility(Constants.datetime_midnight)
+    for lane_id in range(1, lane_count + 1):
+        facility.add_lane(toll_queue.Lane(lane_id, 'GEN'))
+    if seed is not None:
+        facility.set_service_time_model(toll_queue.ServiceTimeModel(seed=seed))
+    return facility
+
+
+def create_arrivals(count, spacing):
+    """:returns: dataframe of cash transactions evenly spaced in seconds"""
+    times = [Constants.datetime_midnight + datetime.timedelta(seconds=i * spacing)
+             for i in range(count)]
+    return pd.DataFrame({'trans date/time': times, 'Lane': 1,
+                         'Payment': 'CASH', 'Axles': 2})
+
+
+def create_corridor(processes=False):
+    """:returns: Corridor of three plazas with arrivals at the first two"""
+    road = corridor.Corridor(processes=processes)
+    road.add_plaza(create_facility(2, seed=1), Constants.travel_time,
+                   create_arrivals(40, 5))
+    road.add_plaza(create_facility(2, seed=2), Constants.travel_time * 2,
+                   create_arrivals(10, 20))
+    road.add_plaza(create_facility(1, seed=3))
+    return road
+
+
+class Test_Corridor():
+    """Validate multi-plaza corridor simulation"""
+
+    def test_handoff_after_travel_time(self):
+        """Validate vehicle reaches next plaza after travel time"""
+        road = corridor.Corridor()
+        first = create_facility()
+        second = create_facility()
+        first.get_lane(1).set_service_time_model(toll_queue.ServiceTimeModel(
+            {('CASH', 'GEN'): toll_queue.NormalDistribution(5, 0)}))
+        road.add_plaza(first, Constants.travel_time, create_arrivals(1, 1))
+        road.add_plaza(second)
+        road.run(60)
+        # queued at 1 second, done at 6, arrives at 36 and is queued at 37
+        lane_summary = second.get_lane_queue_summary()
+        arrival = Constants.datetime_midnight + datetime.timedelta(seconds=38)
+        assert lane_summary[arrival - datetime.timedelta(seconds=1)][1] == 0
+        assert lane_summary[arrival][1] == 1
+        assert road.get_handoffs() == 1
+
+    def test_vehicles_conserved(self):
+        """Validate every vehicle entering is handed off or still queued"""
+        road = create_corridor()
+        road.run(1200)
+        summary = road.summary()
+        assert list(summary['Vehicles']) == [40, 50, 50]
+        assert road.get_handoffs() == 90
+        assert road.get_exits() == 50
+
+    def test_window(self):
+        """Validate window is one second longer than shortest travel time"""
+        assert create_corridor().get_window() == 31
+
+    def test_travel_time_required(self):
+        """Validate ValueError when an inner plaza has no travel time"""
+        road = corridor.Corridor()
+        road.add_plaza(create_facility())
+        road.add_plaza(create_facility())
+        with pytest.raises(ValueError):
+            road.run(10)
+
+    def test_start_time_mismatch(self):
+        """Validate ValueError for plazas starting at different times"""
+        road = corridor.Corridor()
+        road.add_plaza(create_facility(), Constants.travel_time)
+        facility = create_facility()
+        facility.advance_time_facility()
+        with pytest.raises(ValueError):
+            road.add_plaza(facility)
+
+    def test_processes_match_inline(self):
+        """Validate plazas in worker processes match a run in this process"""
+        inline = create_corridor()
+        inline.run(900)
+        road = create_corridor(processes=True)
+        road.run(900)
+        pd.testing.assert_frame_equal(road.summary(), inline.summary())
+        assert road.get_plazas()[2].get_lane_queue_summary() == \
+            inline.get_plazas()[2].get_lane_queue_summary()
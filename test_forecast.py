@@ -0,0 +1,142 @@
+import datetime
+import pandas as pd
+import pytest
+import toll_queue
+import forecast
+
+
+class Constants():
+    """
+    Constant class with variables used for testing
+    """
+    datetime_midnight = datetime.datetime(2020, 1, 1)
+    lane_list = [(1, 'GEN'), (2, 'GEN'), (3, 'GEN')]
+    arrival_rates = {'CASH': 400}
+
+
+def create_facility():
+    """:returns: Facility with a cash queue and lane 3 closed"""
+    facility = toll_queue.Facility(Constants.datetime_midnight)
+    for lane_id, lane_type in Constants.lane_list:
+        facility.add_lane(toll_queue.Lane(lane_id, lane_type))
+    facility.close_lane(3)
+    for i in range(20):
+        facility.add_transaction(toll_queue.Transaction(
+            Constants.datetime_midnight, 'CASH', 2, i))
+    return facility
+
+
+def create_forecast(**kwargs):
+    """:returns: QueueForecast over five minutes"""
+    return forecast.QueueForecast(Constants.arrival_rates,
+                                  horizon=datetime.timedelta(minutes=5),
+                                  replications=10, **kwargs)
+
+
+class Test_QueueForecast():
+    """Validate short-horizon queue forecasts"""
+
+    def test_forecast_bands(self):
+        """Validate percentile bands for each action and lane"""
+        facility = create_facility()
+        queue_forecast = create_forecast(max_workers=1)
+        bands = queue_forecast.forecast(facility, [forecast.OpenLane(3)])
+        assert list(bands.columns) == ['Action', 'Time', 'Lane', 'P10', 'P50', 'P90',
+                                       'Feasible']
+        assert bands['Feasible'].all()
+        assert set(bands['Action']) == {'No Change', 'OpenLane(3)'}
+        assert bands.shape[0] == 2 * 5 * 4
+        assert (bands['P10'] <= bands['P50']).all()
+        assert (bands['P50'] <= bands['P90']).all()
+        total = bands[(bands['Lane'] == 'Total') & (bands['Time'] == bands['Time'].max())]
+        no_change, open_lane = total['P50'].tolist()
+        assert open_lane < no_change
+
+    def test_facility_unchanged(self):
+        """Validate forecast does not modify the running Facility"""
+        facility = create_facility()
+        lane_queue = dict(facility.get_lane_queue())
+        create_forecast(max_workers=1).forecast(facility, [forecast.OpenLane(3)])
+        assert facility.get_current_time() == Constants.datetime_midnight
+        assert not facility.get_lane(3).is_open()
+        assert facility.get_lane_queue() == lane_queue
+
+    def test_common_arrivals(self):
+        """Validate replication is repeatable"""
+        facility = create_facility()
+        queue_forecast = create_forecast(max_workers=1)
+        assert queue_forecast.simulate(facility, None, 2) == \
+            queue_forecast.simulate(facility, None, 2)
+
+    def test_infeasible_action(self):
+        """Validate closing the only lane for a payment type is infeasible"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        facility.add_lane(toll_queue.Lane(1, 'GEN'))
+        facility.add_lane(toll_queue.Lane(2, 'ETC'))
+        queue_forecast = forecast.QueueForecast({'CASH': 100, 'ETC': 400},
+                                                horizon=datetime.timedelta(minutes=5),
+                                                replications=5, max_workers=1)
+        bands = queue_forecast.forecast(facility, [forecast.CloseLane(1),
+                                                   forecast.CloseLane(2)])
+        infeasible = bands[bands['Action'] == 'CloseLane(1)']
+        assert infeasible.shape[0] == 1
+        assert not infeasible['Feasible'].iloc[0]
+        assert infeasible['P50'].isna().all()
+        assert bands[bands['Action'] == 'CloseLane(2)']['Feasible'].all()
+        assert bands[bands['Action'] == 'No Change'].shape[0] == 5 * 3
+
+    def test_action_error_raised(self):
+        """Validate an invalid action raises instead of being reported infeasible"""
+        with pytest.raises(TypeError):
+            create_forecast(max_workers=1).forecast(create_facility(),
+                                                    [forecast.OpenLane('4', 'GEN')])
+
+    def test_close_redistribute_drains(self):
+        """Validate a queue that cannot be redistributed drains through the lane"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        facility.add_lane(toll_queue.Lane(1, 'CASH'))
+        facility.add_lane(toll_queue.Lane(2, 'ETC'))
+        for i in range(3):
+            facility.add_transaction(toll_queue.Transaction(
+                Constants.datetime_midnight, 'CASH', 2, i))
+        forecast.CloseLane(1, redistribute=True)(facility)
+        assert not facility.get_lane(1).is_open()
+        assert facility.get_lane_queue() == {1: 3, 2: 0}
+        queue_forecast = forecast.QueueForecast({'ETC': 400},
+                                                horizon=datetime.timedelta(minutes=5),
+                                                replications=5, max_workers=1)
+        bands = queue_forecast.forecast(facility, [forecast.CloseLane(2, redistribute=True)])
+        assert not bands[bands['Action'] == 'CloseLane(2, redistribute)']['Feasible'].any()
+
+    def test_new_lane_requires_type(self):
+        """Validate ValueError opening an unknown lane without a type"""
+        with pytest.raises(ValueError):
+            forecast.OpenLane(9)(create_facility())
+
+    def test_arrival_rates(self):
+        """Validate recent arrival rates per hour"""
+        times = [Constants.datetime_midnight + datetime.timedelta(minutes=i)
+                 for i in range(30)]
+        df = pd.DataFrame({'trans date/time': times, 'Lane': 1,
+                           'Payment': ['CASH', 'ETC'] * 15, 'Axles': 2})
+        rates = forecast.arrival_rates(df, Constants.datetime_midnight +
+                                       datetime.timedelta(minutes=30))
+        assert rates == {'CASH': 28.0, 'ETC': 32.0}
+
+    def test_process_pool(self):
+        """Validate forecast in worker processes matches local runs"""
+        facility = create_facility()
+        queue_forecast = create_forecast(max_workers=2)
+        local_forecast = create_forecast(max_workers=1)
+        try:
+            bands = queue_forecast.forecast(facility, [forecast.CloseLane(2)])
+            pd.testing.assert_frame_equal(
+                bands, local_forecast.forecast(facility, [forecast.CloseLane(2)]))
+            # workers restart with new arrival rates
+            queue_forecast.set_arrival_rates({'CASH': 100})
+            local_forecast.set_arrival_rates({'CASH': 100})
+            bands = queue_forecast.forecast(facility, [forecast.CloseLane(2)])
+            pd.testing.assert_frame_equal(
+                bands, local_forecast.forecast(facility, [forecast.CloseLane(2)]))
+        finally:
+            queue_forecast.close()
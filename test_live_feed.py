@@ -0,0 +1,145 @@
+import asyncio
+import datetime
+import pandas as pd
+import toll_queue
+import live_feed
+
+
+class Constants():
+    """
+    Constant class with variables used for testing
+    """
+    datetime_midnight = datetime.datetime(2020, 1, 1)
+    lane_list = [(1, 'GEN'), (2, 'GEN')]
+
+
+def create_facility():
+    """:returns: Facility starting at midnight with two GEN lanes"""
+    facility = toll_queue.Facility(Constants.datetime_midnight)
+    for lane_id, lane_type in Constants.lane_list:
+        facility.add_lane(toll_queue.Lane(lane_id, lane_type))
+    return facility
+
+
+def create_arrivals(count):
+    """:returns: dataframe of ETC transactions one second apart in lane 1"""
+    times = [Constants.datetime_midnight + datetime.timedelta(seconds=i)
+             for i in range(count)]
+    return pd.DataFrame({'trans date/time': times, 'Lane': 1,
+                         'Payment': 'ETC', 'Axles': 2})
+
+
+class Test_LiveFeedService():
+    """Validate asyncio live feed service"""
+
+    def test_records_held_until_due(self):
+        """Validate records are added once facility time passes them"""
+        service = live_feed.LiveFeedService(create_facility())
+        service.add_record({'time': '2020-01-01T00:00:02', 'payment': 'ETC',
+                            'axles': 2})
+        service.add_record({'time': '2020-01-01T00:00:00', 'payment': 'ETC',
+                            'axles': 2})
+        service.step()
+        assert service.snapshot()['pending'] == 2
+        service.step()
+        assert service.snapshot()['pending'] == 1
+        service.step()
+        service.step()
+        assert service.snapshot()['pending'] == 0
+
+    def test_unplaceable_records_rejected(self):
+        """Validate records without an eligible or known lane are counted"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        facility.add_lane(toll_queue.Lane(1, 'ETC'))
+        service = live_feed.LiveFeedService(facility)
+        service.add_record({'time': '2020-01-01T00:00:00', 'payment': 'CASH',
+                            'axles': 2})
+        service.add_record({'time': '2020-01-01T00:00:00', 'payment': 'ETC',
+                            'axles': 2})
+        service.step()
+        service.step()
+        assert service.get_records_rejected() == 1
+        assert service.snapshot()['rejected'] == 1
+        assert service.snapshot()['lanes'] == {1: 1}
+
+        replay_service = live_feed.LiveFeedService(create_facility(), replay=True)
+        replay_service.add_record({'time': '2020-01-01T00:00:00', 'payment': 'ETC',
+                                   'axles': 2, 'lane': 9})
+        replay_service.step()
+        replay_service.step()
+        assert replay_service.get_records_rejected() == 1
+
+    def test_ingest_skips_invalid(self):
+        """Validate stream ingestion skips invalid lines"""
+        async def ingest():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b'{"time": "2020-01-01T00:00:00", "payment": "CC", "axles": 2}\n'
+                             b'not json\n'
+                             b'{"time": "2020-01-01T00:00:00", "payment": "XX", "axles": 2}\n'
+                             b'\n')
+            reader.feed_eof()
+            return await service.ingest(reader)
+
+        service = live_feed.LiveFeedService(create_facility())
+        assert asyncio.run(ingest()) == 1
+        assert service.get_records_received() == 1
+
+    def test_timezone_records_skipped(self):
+        """Validate records with a timezone are skipped without stopping the run"""
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b'{"time": "2020-01-01T00:00:00", "payment": "CC", "axles": 2}\n'
+                             b'{"time": "2020-01-01T00:00:00Z", "payment": "CC", "axles": 2}\n'
+                             b'{"time": "2020-01-01T00:00:00+00:00", "payment": "CC", '
+                             b'"axles": 2}\n')
+            reader.feed_eof()
+            count = await service.ingest(reader)
+            await service.run(until=Constants.datetime_midnight +
+                              datetime.timedelta(seconds=5))
+            return count
+
+        service = live_feed.LiveFeedService(create_facility(), time_scale=1000)
+        assert asyncio.run(run()) == 1
+        assert service.get_records_received() == 1
+        assert service.snapshot()['pending'] == 0
+
+    def test_run_publishes_estimates(self):
+        """Validate accelerated run advances facility and publishes"""
+        async def run():
+            subscriber = service.subscribe()
+            for i in range(20):
+                service.add_record({'time': Constants.datetime_midnight, 'payment': 'CASH',
+                                    'axles': 2})
+            await service.run(until=Constants.datetime_midnight +
+                              datetime.timedelta(seconds=30))
+            return subscriber.get_nowait()
+
+        facility = create_facility()
+        service = live_feed.LiveFeedService(facility, time_scale=2000)
+        estimate = asyncio.run(run())
+        assert facility.get_current_time() == Constants.datetime_midnight + \
+            datetime.timedelta(seconds=30)
+        assert estimate['time'] == facility.get_current_time()
+        assert estimate['queue_length'] == sum(estimate['lanes'].values())
+        assert estimate['queue_length'] > 0
+
+    def test_serve_local_feed(self):
+        """Validate records sent over a socket by the local feed are replayed"""
+        async def run():
+            server = await service.serve()
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await live_feed.feed_dataframe(create_arrivals(10), writer,
+                                           Constants.datetime_midnight,
+                                           time_scale=1000)
+            await service.run(until=Constants.datetime_midnight +
+                              datetime.timedelta(seconds=15))
+            server.close()
+            await server.wait_closed()
+
+        facility = create_facility()
+        service = live_feed.LiveFeedService(facility, time_scale=1000, replay=True)
+        asyncio.run(run())
+        assert service.get_records_received() == 10
+        lane_summary = facility.get_lane_queue_summary()
+        assert all(queue[2] == 0 for queue in lane_summary.values())
@@ -0,0 +1,121 @@
+import os
+import datetime
+import pandas as pd
+import pytest
+import toll_queue
+import queue_screen
+
+
+class Constants():
+    """
+    Constant class with variables used for testing
+    """
+    datetime_midnight = datetime.datetime(2020, 1, 1)
+    gen_lane_list = [(1, 'GEN'), (2, 'GEN')]
+    mixed_lane_list = [(1, 'GEN'), (2, 'GEN'), (3, 'GEN'), (4, 'GEN'), (5, 'GEN'),
+                       (6, 'GEN'), (7, 'ETC'), (8, 'ETC'), (9, 'ETC'), (10, 'ETC')]
+    sample_data = os.path.join(os.path.dirname(__file__), '20190504.csv')
+
+
+def create_arrivals(pmt_type, count, seconds):
+    """:returns: dataframe of evenly spaced transactions from midnight"""
+    times = [Constants.datetime_midnight + datetime.timedelta(seconds=i * seconds / count)
+             for i in range(count)]
+    return pd.DataFrame({'trans date/time': times, 'Lane': 1,
+                         'Payment': pmt_type, 'Axles': 2})
+
+
+class Test_QueueScreen():
+    """Validate analytical queue screen"""
+
+    def test_erlang_c_single_server(self):
+        """Probability of waiting for a single lane equals utilization"""
+        screen = queue_screen.QueueScreen(Constants.gen_lane_list)
+        assert screen.erlang_c(1, 0.4) == pytest.approx(0.4)
+        assert screen.erlang_c(2, 2.5) == 1.0
+
+    def test_invalid_lane_list(self):
+        """Validate lane IDs and types are checked"""
+        with pytest.raises(TypeError):
+            queue_screen.QueueScreen([('1', 'GEN')])
+        with pytest.raises(ValueError):
+            queue_screen.QueueScreen([(1, 'XX')])
+        with pytest.raises(TypeError):
+            queue_screen.QueueScreen(Constants.gen_lane_list, service_time_model={})
+
+    def test_light_load(self):
+        """Validate lightly loaded interval has short queue"""
+        screen = queue_screen.QueueScreen(Constants.gen_lane_list)
+        df = create_arrivals('ETC', 60, 900)
+        estimate = screen.estimate(df)
+        assert estimate.shape[0] == 1
+        assert estimate['Arrivals'].iloc[0] == pytest.approx(60)
+        assert estimate['Utilization'].iloc[0] < 0.5
+        assert estimate['Queue_Length'].iloc[0] < 1
+        assert not estimate['Saturated'].iloc[0]
+
+    def test_overload_carries_backlog(self):
+        """Validate overloaded interval backlog carries into next interval"""
+        screen = queue_screen.QueueScreen(Constants.gen_lane_list)
+        df = create_arrivals('CASH', 300, 900)
+        estimate = screen.estimate(df, end_time=Constants.datetime_midnight +
+                                   datetime.timedelta(minutes=15))
+        assert estimate['Saturated'].iloc[0]
+        assert estimate['Arrivals'].iloc[1] == 0
+        assert estimate['Queue_Length'].iloc[1] > 0
+
+    def test_pool_split(self):
+        """Validate dedicated lanes share traffic with general lanes"""
+        screen = queue_screen.QueueScreen([(1, 'ETC'), (2, 'GEN')])
+        assert screen.eligible_pools('ETC') == ['ETC', 'GEN']
+        assert screen.eligible_pools('CASH') == ['GEN']
+
+    def test_pool_split_balances_utilization(self):
+        """Validate flexible traffic brings eligible pools to equal utilization"""
+        screen = queue_screen.QueueScreen([(1, 'ETC'), (2, 'GEN'), (3, 'GEN')])
+        split = screen._pool_split({'ETC': 0.3, 'CASH': 0.05})
+        assert split['CASH'] == {'GEN': 0.05}
+        assert split['ETC']['ETC'] + split['ETC']['GEN'] == pytest.approx(0.3)
+        etc_utilization = split['ETC']['ETC'] * screen.service_time_moments('ETC', 'ETC')[0]
+        gen_utilization = (split['ETC']['GEN'] * screen.service_time_moments('ETC', 'GEN')[0] +
+                           0.05 * screen.service_time_moments('CASH', 'GEN')[0]) / 2
+        assert etc_utilization == pytest.approx(gen_utilization)
+
+    def test_no_eligible_lane(self):
+        """Validate TypeError when no lane can process a payment type"""
+        screen = queue_screen.QueueScreen([(1, 'ETC')])
+        with pytest.raises(TypeError):
+            screen.estimate(create_arrivals('CASH', 10, 900))
+
+    def test_compare_with_facility(self):
+        """Validate comparison report against a simulated Facility"""
+        screen = queue_screen.QueueScreen([(1, 'ETC')])
+        df = create_arrivals('ETC', 30, 900)
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        facility.add_lane(toll_queue.Lane(1, 'ETC'))
+        for i in range(900):
+            facility.advance_time_facility()
+        report = screen.compare_with_facility(facility, screen.estimate(df))
+        assert list(report.columns) == ['Estimated_Queue_Length',
+                                        'Simulated_Queue_Length',
+                                        'Difference', 'Diverges']
+        assert report['Simulated_Queue_Length'].iloc[0] == 0
+
+    def test_mixed_lanes_match_facility(self):
+        """Validate estimate for general and ETC lanes against a simulation"""
+        start_time = datetime.datetime(2019, 5, 4, 11)
+        df = pd.read_csv(Constants.sample_data)
+        df['trans date/time'] = pd.to_datetime(df['trans date/time'])
+        df = df[(df['trans date/time'] >= start_time) &
+                (df['trans date/time'] < start_time + datetime.timedelta(hours=1))]
+        screen = queue_screen.QueueScreen(Constants.mixed_lane_list)
+        estimate = screen.estimate(df, start_time=start_time)
+        assert not estimate['Saturated'].any()
+
+        facility = toll_queue.Facility(start_time)
+        for lane_id, lane_type in Constants.mixed_lane_list:
+            facility.add_lane(toll_queue.Lane(lane_id, lane_type))
+        facility.set_service_time_model(toll_queue.ServiceTimeModel(seed=0))
+        toll_queue.Util().run_facility(facility, df, 60 * 60)
+        report = screen.compare_with_facility(facility, estimate)
+        assert not report['Diverges'].any()
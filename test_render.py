@@ -0,0 +1,83 @@
+import os
+import sys
+import datetime
+import subprocess
+import pytest
+
+render = pytest.importorskip('render')
+
+
+class Test_Render():
+    """Validate rendering of simulation output"""
+
+    def test_plot_lane_queues(self, tmp_path):
+        """Validate lane queue plot is written to the directory"""
+        simulation_time = datetime.datetime(2020, 1, 1, 8, 5, 3)
+        name = render.plot_lane_queues([(1, 'GEN'), (2, 'ETC')], {1: 3, 2: 0},
+                                       simulation_time, directory=str(tmp_path))
+        assert os.path.basename(name) == '20200101T080503.png'
+        assert os.path.exists(name)
+
+    def test_write_video(self, tmp_path):
+        """Validate png files are combined into a video and removed"""
+        for second in range(3):
+            render.plot_lane_queues([(1, 'GEN')], {1: second},
+                                    datetime.datetime(2020, 1, 1, 0, 0, second),
+                                    directory=str(tmp_path))
+        path = render.write_video(directory=str(tmp_path))
+        assert os.path.exists(path)
+        assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.png')]
+
+    def create_facility(self):
+        """:returns: Facility simulated for two minutes with a cash queue"""
+        import toll_queue
+        facility = toll_queue.Facility(datetime.datetime(2020, 1, 1))
+        facility.add_lane(toll_queue.Lane(1, 'GEN'))
+        facility.add_lane(toll_queue.Lane(2, 'ETC'))
+        for i in range(10):
+            facility.add_transaction(toll_queue.Transaction(
+                datetime.datetime(2020, 1, 1), 'CASH', 2, i))
+        for second in range(120):
+            facility.advance_time_facility()
+        return facility
+
+    def test_write_report_png(self, tmp_path):
+        """Validate png report is written"""
+        path = render.write_report(self.create_facility(), directory=str(tmp_path))
+        assert path == os.path.join(str(tmp_path), 'queue_report.png')
+        with open(path, 'rb') as report:
+            assert report.read(8) == b'\x89PNG\r\n\x1a\n'
+
+    def test_write_report_html(self, tmp_path):
+        """Validate html report has the chart and peak queue by lane"""
+        path = render.write_report(self.create_facility(), name='queue_report.html',
+                                   directory=str(tmp_path), bin_seconds=7)
+        with open(path) as report:
+            text = report.read()
+        assert 'data:image/png;base64,' in text
+        assert '<tr><td>1</td><td>10</td><td>2020-01-01 00:00:01</td>' in text
+        assert '<tr><td>Total</td>' in text
+
+    def test_write_report_requires_run(self, tmp_path):
+        """Validate ValueError for a facility without a queue summary"""
+        import toll_queue
+        with pytest.raises(ValueError):
+            render.write_report(toll_queue.Facility(datetime.datetime(2020, 1, 1)),
+                                directory=str(tmp_path))
+
+    def test_import_keeps_backend(self):
+        """Validate importing render does not load pyplot or set a backend"""
+        code = 'import sys, render; print("matplotlib.pyplot" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert output.stdout.strip() == 'False'
+
+    def test_report_without_opencv(self, tmp_path):
+        """Validate reports are written without OpenCV installed"""
+        code = ('import sys; sys.modules["cv2"] = None; import datetime, render; '
+                'render.plot_lane_queues([(1, "GEN")], {1: 1}, '
+                'datetime.datetime(2020, 1, 1), directory=sys.argv[1])')
+        subprocess.run([sys.executable, '-c', code, str(tmp_path)], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert os.listdir(str(tmp_path)) == ['20200101T000000.png']
@@ -0,0 +1,97 @@
+import os
+import datetime
+import pandas as pd
+import pytest
+import toll_queue
+import replay
+
+
+class Constants():
+    """
+    Constant class with variables used for testing
+    """
+    datetime_midnight = datetime.datetime(2020, 1, 1)
+    lane_list = [(1, 'GEN'), (2, 'GEN')]
+    sample_lane_list = [(1, 'GEN'), (2, 'GEN'), (3, 'GEN'), (4, 'GEN'), (5, 'GEN'),
+                        (6, 'GEN'), (7, 'ETC'), (8, 'ETC'), (9, 'ETC'), (10, 'ETC')]
+    sample_data = os.path.join(os.path.dirname(__file__), '20190504.csv')
+
+
+def create_arrivals(lane_id, count):
+    """:returns: dataframe of ETC transactions one second apart in a lane"""
+    times = [Constants.datetime_midnight + datetime.timedelta(seconds=i)
+             for i in range(count)]
+    return pd.DataFrame({'trans date/time': times, 'Lane': lane_id,
+                         'Payment': 'ETC', 'Axles': 2})
+
+
+class Test_Replay():
+    """Validate replay of recorded lanes"""
+
+    def test_add_transaction_to_lane(self):
+        """Validate transaction is added to lane regardless of wait time"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        for lane_id, lane_type in Constants.lane_list:
+            facility.add_lane(toll_queue.Lane(lane_id, lane_type))
+        for i in range(3):
+            trxn = toll_queue.Transaction(Constants.datetime_midnight, 'ETC', 2, i)
+            facility.add_transaction_to_lane(trxn, 2)
+        assert facility.get_lane_queue() == {1: 0, 2: 3}
+        with pytest.raises(ValueError):
+            facility.add_transaction_to_lane(trxn, 3)
+
+    def test_run_facility_replay(self):
+        """Validate replayed transactions stay in recorded lane"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        for lane_id, lane_type in Constants.lane_list:
+            facility.add_lane(toll_queue.Lane(lane_id, lane_type))
+        toll_queue.Util().run_facility(facility, create_arrivals(1, 20), 10,
+                                       replay=True)
+        lane_summary = facility.get_lane_queue_summary()
+        assert len(lane_summary) == 10
+        assert all(queue[2] == 0 for queue in lane_summary.values())
+        assert max(queue[1] for queue in lane_summary.values()) > 1
+
+    def test_comparison(self):
+        """Validate replay and routed traces and summary"""
+        comparison = replay.ReplayComparison(Constants.lane_list,
+                                             Constants.datetime_midnight)
+        trace = comparison.run(create_arrivals(1, 60), seconds=120)
+        assert trace.shape[0] == 120
+        assert 'Replay_Lane_1' in trace.columns
+        assert 'Routed_Lane_2' in trace.columns
+        assert (trace['Difference'] ==
+                trace['Replay_Total'] - trace['Routed_Total']).all()
+        summary = comparison.summary()
+        assert list(summary.index) == [1, 2, 'Total']
+        assert summary.loc[2, 'Replay_Max'] == 0
+        assert summary.loc[2, 'Routed_Max'] > 0
+
+    def test_missing_recorded_lane(self):
+        """Validate ValueError when recorded lane is not configured"""
+        comparison = replay.ReplayComparison(Constants.lane_list,
+                                             Constants.datetime_midnight)
+        with pytest.raises(ValueError):
+            comparison.run(create_arrivals(5, 10), seconds=10)
+
+    def test_sample_data(self):
+        """Validate replay of pay-by-mail vehicles recorded in ETC lanes"""
+        start_time = datetime.datetime(2019, 5, 4, 8)
+        df = pd.read_csv(Constants.sample_data)
+        df['trans date/time'] = pd.to_datetime(df['trans date/time'])
+        df = df[(df['trans date/time'] >= start_time) &
+                (df['trans date/time'] < start_time + datetime.timedelta(minutes=30))]
+        assert ((df['Payment'] == 'PBM') & (df['Lane'] >= 7)).any()
+        comparison = replay.ReplayComparison(Constants.sample_lane_list, start_time)
+        trace = comparison.run(df, seconds=30 * 60)
+        assert trace.shape[0] == 30 * 60
+        replay_facility = comparison.get_replay_facility()
+        assert len(replay_facility.get_wait_times()) > 0.9 * df.shape[0]
+
+    def test_duplicate_lane_id(self):
+        """Validate ValueError when a lane ID is added twice"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        facility.add_lane(toll_queue.Lane(1, 'GEN'))
+        with pytest.raises(ValueError):
+            facility.add_lane(toll_queue.Lane(1, 'ETC'))
+        assert facility.get_lane(1).get_lane_type() == 'GEN'
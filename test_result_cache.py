@@ -0,0 +1,86 @@
+import os
+import time
+import datetime
+import pandas as pd
+import pytest
+import toll_queue
+import result_cache
+
+
+class Constants():
+    """
+    Constant class with variables used for testing
+    """
+    datetime_midnight = datetime.datetime(2020, 1, 1)
+    lane_list = [(1, 'GEN'), (2, 'GEN')]
+
+
+def create_arrivals(count):
+    """:returns: dataframe of cash transactions five seconds apart"""
+    times = [Constants.datetime_midnight + datetime.timedelta(seconds=i * 5)
+             for i in range(count)]
+    return pd.DataFrame({'trans date/time': times, 'Lane': 1,
+                         'Payment': 'CASH', 'Axles': 2})
+
+
+class Test_ResultCache():
+    """Validate content-addressed result cache"""
+
+    def test_repeat_run_from_cache(self, tmp_path, monkeypatch):
+        """Validate repeat scenario is read from cache without simulating"""
+        cache = result_cache.ResultCache(str(tmp_path))
+        df = create_arrivals(20)
+        first = cache.run(Constants.lane_list, df, Constants.datetime_midnight,
+                          seconds=120, seed=1)
+
+        def fail(*args, **kwargs):
+            raise AssertionError('simulated again')
+
+        monkeypatch.setattr(toll_queue.Util, 'run_facility', fail)
+        second = cache.run(Constants.lane_list, df, Constants.datetime_midnight,
+                           seconds=120, seed=1)
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_key_changes_with_inputs(self, tmp_path):
+        """Validate every input changes the key"""
+        cache = result_cache.ResultCache(str(tmp_path))
+        df = create_arrivals(20)
+        model = toll_queue.ServiceTimeModel(seed=1)
+        base = cache.key(Constants.lane_list, df, Constants.datetime_midnight, 60, model)
+        assert base == cache.key(Constants.lane_list, df.copy(),
+                                 Constants.datetime_midnight, 60, model.copy())
+        keys = [
+            cache.key([(1, 'GEN')], df, Constants.datetime_midnight, 60, model),
+            cache.key(Constants.lane_list, create_arrivals(21),
+                      Constants.datetime_midnight, 60, model),
+            cache.key(Constants.lane_list, df, Constants.datetime_midnight, 61, model),
+            cache.key(Constants.lane_list, df, Constants.datetime_midnight, 60,
+                      toll_queue.ServiceTimeModel(seed=2)),
+            result_cache.ResultCache(str(tmp_path), code_version='other').key(
+                Constants.lane_list, df, Constants.datetime_midnight, 60, model),
+        ]
+        assert base not in keys
+        assert len(set(keys)) == len(keys)
+
+    def test_requires_seed(self, tmp_path):
+        """Validate ValueError for unseeded runs"""
+        cache = result_cache.ResultCache(str(tmp_path))
+        with pytest.raises(ValueError):
+            cache.run(Constants.lane_list, create_arrivals(5),
+                      Constants.datetime_midnight, seconds=10)
+
+    def test_lru_eviction(self, tmp_path):
+        """Validate least recently used result is evicted above size limit"""
+        cache = result_cache.ResultCache(str(tmp_path), max_bytes=10 ** 6)
+        result = pd.DataFrame({'Queue_Length': range(1000)})
+        cache.put('a', result)
+        cache.put('b', result)
+        past = time.time() - 100
+        os.utime(os.path.join(str(tmp_path), 'a.pkl'), (past, past))
+        os.utime(os.path.join(str(tmp_path), 'b.pkl'), (past - 10, past - 10))
+        assert cache.get('b') is not None
+        smaller_cache = result_cache.ResultCache(str(tmp_path),
+                                                 max_bytes=cache.get_size() - 1)
+        smaller_cache.evict()
+        assert cache.get('a') is None
+        assert cache.get('b') is not None
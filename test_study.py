@@ -0,0 +1,88 @@
+import datetime
+import pandas as pd
+import pytest
+import study
+
+
+class Constants():
+    """
+    Constant class with variables used for testing
+    """
+    datetime_midnight = datetime.datetime(2020, 1, 1)
+    lane_list = [(1, 'GEN'), (2, 'GEN')]
+
+
+def create_arrivals(count, spacing):
+    """:returns: dataframe of cash transactions evenly spaced in seconds"""
+    times = [Constants.datetime_midnight + datetime.timedelta(seconds=i * spacing)
+             for i in range(count)]
+    return pd.DataFrame({'trans date/time': times, 'Lane': 1,
+                         'Payment': 'CASH', 'Axles': 2})
+
+
+def create_study(**kwargs):
+    """:returns: ReplicationStudy of a short busy period"""
+    return study.ReplicationStudy(Constants.lane_list, create_arrivals(60, 5),
+                                  Constants.datetime_midnight, seconds=600,
+                                  **kwargs)
+
+
+class Test_ReplicationStudy():
+    """Validate adaptive replication study"""
+
+    def test_replication_repeatable(self):
+        """Validate replication with the same seed gives the same metrics"""
+        replication_study = create_study(max_workers=1)
+        assert replication_study.run_replication(3) == \
+            replication_study.run_replication(3)
+        assert replication_study.run_replication(3) != \
+            replication_study.run_replication(4)
+
+    def test_stops_at_precision(self):
+        """Validate study stops once precision is reached"""
+        replication_study = create_study(max_workers=1, relative_precision=0.5,
+                                         max_replications=50)
+        summary = replication_study.run()
+        assert summary['Converged'].all()
+        assert summary['Replications'].iloc[0] < 50
+        assert replication_study.get_results().shape[0] == \
+            summary['Replications'].iloc[0]
+
+    def test_stops_at_max_replications(self):
+        """Validate study stops at maximum replications when not converged"""
+        replication_study = create_study(max_workers=1, precision={'peak_queue': 0},
+                                         metrics=['peak_queue'], max_replications=5)
+        summary = replication_study.run()
+        assert summary.loc['peak_queue', 'Replications'] == 5
+
+    def test_confidence_interval(self):
+        """Validate confidence interval half-width"""
+        replication_study = create_study(max_workers=1)
+        mean, half_width = replication_study.confidence_interval([1.0, 3.0])
+        assert mean == 2.0
+        assert half_width == pytest.approx(12.706)
+
+    def test_queued_vehicles_delay(self):
+        """Validate vehicles still queued at the end count in the wait metrics"""
+        replication_study = study.ReplicationStudy(Constants.lane_list,
+                                                   create_arrivals(60, 0),
+                                                   Constants.datetime_midnight,
+                                                   seconds=5, max_workers=1)
+        values = replication_study.run_replication(0)
+        # two vehicles start processing after 1 second, 58 wait 5 seconds
+        assert values['vehicle_seconds_delay'] == 2 * 1 + 58 * 5
+        assert values['p95_wait'] == 5
+
+    def test_invalid_metric(self):
+        """Validate ValueError for unknown metric"""
+        with pytest.raises(ValueError):
+            create_study(metrics=['queue'])
+
+    def test_process_pool(self):
+        """Validate replications in worker processes match local runs"""
+        replication_study = create_study(max_workers=2, batch_size=2,
+                                         min_replications=2, max_replications=2)
+        replication_study.run()
+        results = replication_study.get_results()
+        assert results.shape[0] == 2
+        assert results.iloc[1].to_dict() == replication_study.run_replication(1)
@@ -1,4 +1,7 @@
+import os
+import sys
 import random
+import subprocess
 import toll_queue
 import datetime
 import pytest
@@ -211,6 +214,42 @@ class Test_Lane():
             assert process_time >= range_low
             assert process_time <= range_high
 
+    def test_wait_time_bookkeeping(self):
+        """Validate lane wait time stays equal to the time remaining in the queue"""
+        model = toll_queue.ServiceTimeModel(
+            {('CASH', 'GEN'): toll_queue.NormalDistribution(2.5, 0)})
+        lane = toll_queue.Lane(1, 'GEN', model)
+
+        def remaining():
+            return sum((trxn.get_time_remaining_trxn() for trxn in lane.get_queue()),
+                       datetime.timedelta())
+
+        for i in range(4):
+            lane.add_transaction(toll_queue.Transaction(Constants.datetime_midnight,
+                                                        'CASH', 2, i))
+        assert lane.get_wait_time() == datetime.timedelta(seconds=10)
+        one_second = datetime.timedelta(seconds=1)
+        lane.advance_time_lane(one_second)
+        lane.advance_time_lane(one_second)
+        assert lane.get_wait_time() == datetime.timedelta(seconds=8) == remaining()
+        # completion removes only the half second left, not the whole tick
+        assert lane.advance_time_lane(one_second).get_trx_id() == 0
+        assert lane.get_wait_time() == datetime.timedelta(seconds=7.5) == remaining()
+
+        lane_copy = lane.copy()
+        lane_copy.advance_time_lane(one_second)
+        assert lane_copy.get_wait_time() == datetime.timedelta(seconds=6.5)
+        assert lane.get_wait_time() == datetime.timedelta(seconds=7.5) == remaining()
+
+        waiting = lane.remove_waiting_transactions()
+        assert [trxn.get_trx_id() for trxn in waiting] == [2, 3]
+        assert lane.get_wait_time() == datetime.timedelta(seconds=2.5) == remaining()
+        lane.advance_time_lane(one_second)
+        lane.advance_time_lane(one_second)
+        lane.advance_time_lane(one_second)
+        assert lane.get_wait_time() == datetime.timedelta() == remaining()
+        assert lane.advance_time_lane(one_second) is None
+
     def test_set_lane_type(self):
         """Validate set lane type method"""
         lane = self.create_random_lane()
@@ -320,6 +359,29 @@ class Test_Facility():
         assert test_facility.get_total_wait_time() == datetime.timedelta()
         assert test_facility.total_queue() == 0
 
+    def test_wait_time_at_processing_start(self):
+        """Validate wait is recorded when processing starts, from creation"""
+        model = toll_queue.ServiceTimeModel(
+            {('CASH', 'GEN'): toll_queue.NormalDistribution(10, 0)})
+        test_facility = toll_queue.Facility(Constants.datetime_midnight)
+        test_facility.add_lane(toll_queue.Lane(1, 'GEN', model))
+        test_facility.advance_time_facility()
+        trxns = [toll_queue.Transaction(Constants.datetime_midnight, 'CASH', 2, i)
+                 for i in range(3)]
+        for trxn in trxns:
+            test_facility.add_transaction(trxn)
+        assert all(trxn.get_wait_time() is None for trxn in trxns)
+        for i in range(15):
+            test_facility.advance_time_facility()
+        assert test_facility.get_wait_times() == [datetime.timedelta(seconds=1)]
+        assert test_facility.get_queued_wait_times() == \
+            [datetime.timedelta(seconds=11), datetime.timedelta(seconds=16)]
+        for i in range(20):
+            test_facility.advance_time_facility()
+        assert [wait.total_seconds() for wait in test_facility.get_wait_times()] == \
+            [1, 11, 21]
+        assert test_facility.get_queued_wait_times() == []
+
     def test_add_cash_to_ETC_lane(self):
         """Validate TypeError for invalid transaction being added to a lane"""
         test_facility = self.create_test_facility_w_todays_date()
@@ -327,3 +389,373 @@ class Test_Facility():
         cash_trxn = self.create_midnight_cash_trxn()
         with pytest.raises(TypeError):
             test_facility.add_transaction(cash_trxn)
+
+
+class Test_ServiceTimeModel():
+    """Validate table-driven processing time model"""
+
+    def create_trxn(self, pmt_type, axel_cnt=Constants.axel_cnt_2):
+        """:returns: Transaction starting at midnight"""
+        return toll_queue.Transaction(Constants.datetime_midnight, pmt_type,
+                                      axel_cnt, random.randint(1, 10000))
+
+    def test_pairs_missing_from_dispatch(self):
+        """Validate PBM and cash-only lane transactions get processing time"""
+        for pmt_type, lane_type in [('PBM', 'GEN'), ('CASH', 'CASH')]:
+            lane = toll_queue.Lane(1, lane_type)
+            trxn = self.create_trxn(pmt_type)
+            lane.add_transaction(trxn)
+            assert trxn.get_process_time() > datetime.timedelta()
+
+    def test_unknown_pair(self):
+        """Validate ValueError when no processing time for pair"""
+        model = toll_queue.ServiceTimeModel()
+        with pytest.raises(ValueError):
+            model.get_distribution('CASH', 'ETC')
+        lane = toll_queue.Lane(1, 'ETC')
+        with pytest.raises(ValueError):
+            lane.add_transaction(self.create_trxn(Constants.pmt_type_cash))
+
+    def test_axle_adjustment(self):
+        """Validate additional axles add processing time"""
+        model = toll_queue.ServiceTimeModel(
+            {('CASH', 'GEN'): toll_queue.NormalDistribution(10, 0)})
+        model.set_axle_adjustment('GEN', 3)
+        lane = toll_queue.Lane(1, 'GEN', model)
+        trxn_2 = self.create_trxn(Constants.pmt_type_cash, 2)
+        trxn_5 = self.create_trxn(Constants.pmt_type_cash, 5)
+        lane.add_transaction(trxn_2)
+        lane.add_transaction(trxn_5)
+        assert trxn_2.get_process_time() == datetime.timedelta(seconds=10)
+        assert trxn_5.get_process_time() == datetime.timedelta(seconds=19)
+
+    def test_lognormal_distribution(self):
+        """Validate lognormal draws are positive with expected mean"""
+        distribution = toll_queue.LognormalDistribution(13.5, 2.5)
+        draws = distribution.sample(size=10000)
+        assert (draws > 0).all()
+        assert abs(draws.mean() - 13.5) < 0.2
+
+    def test_empirical_distribution(self):
+        """Validate empirical draws stay within observed processing times"""
+        distribution = toll_queue.EmpiricalDistribution([4, 5, 6, 9])
+        draws = distribution.sample(size=1000)
+        assert draws.min() >= 4 and draws.max() <= 9
+        assert distribution.get_mean() == 6
+
+    def test_sample_seconds_batch(self):
+        """Validate batch sampling across payment and lane types"""
+        model = toll_queue.ServiceTimeModel()
+        model.set_distribution('ETC', 'ETC', toll_queue.NormalDistribution(5, 0))
+        draws = model.sample_seconds(['ETC', 'CASH', 'ETC'],
+                                     ['ETC', 'GEN', 'ETC'])
+        assert draws.shape == (3,)
+        assert draws[0] == 5 and draws[2] == 5
+
+    def test_processing_time_methods_use_model(self):
+        """Validate per-pair processing time methods draw from the lane model"""
+        model = toll_queue.ServiceTimeModel(
+            {('CASH', 'GEN'): toll_queue.NormalDistribution(10, 0)}, seed=5)
+        model.set_distribution('ETC', 'GEN', toll_queue.NormalDistribution(6, 1))
+        lane = toll_queue.Lane(1, 'GEN', model)
+        assert lane.processing_time_cash_gen_lane() == datetime.timedelta(seconds=10)
+        assert lane.processing_time_etc_gen_lane(stream_key=3) == \
+            model.processing_time('ETC', 'GEN', stream_key=3)
+        with pytest.raises(ValueError):
+            lane.processing_time_credit_gen_lane()
+
+    def test_distribution_is_abstract(self):
+        """Validate base distribution requires a transform"""
+        with pytest.raises(TypeError):
+            toll_queue.ProcessingTimeDistribution(1, 1)
+
+    def test_facility_service_time_model(self):
+        """Validate facility model applies to existing and new lanes"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        facility.add_lane(toll_queue.Lane(1, 'GEN'))
+        model = toll_queue.ServiceTimeModel()
+        facility.set_service_time_model(model)
+        facility.add_lane(toll_queue.Lane(2, 'ETC'))
+        for lane in facility._all_lanes:
+            assert lane.get_service_time_model() is model
+
+
+class Test_Schedule():
+    """Validate scheduled lane changes during a run"""
+
+    def create_trxn(self, pmt_type):
+        """:returns: Transaction starting at midnight"""
+        return toll_queue.Transaction(Constants.datetime_midnight, pmt_type,
+                                      Constants.axel_cnt_2, random.randint(1, 10000))
+
+    def create_facility(self, lane_list):
+        """:returns: Facility starting at midnight with lanes"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        for lane_id, lane_type in lane_list:
+            facility.add_lane(toll_queue.Lane(lane_id, lane_type))
+        return facility
+
+    def test_scheduled_open(self):
+        """Validate lane opens at scheduled time"""
+        facility = self.create_facility([(1, 'GEN')])
+        open_time = Constants.datetime_midnight + datetime.timedelta(seconds=5)
+        facility.schedule_lane_open(open_time, toll_queue.Lane(2, 'GEN'))
+        assert len(facility.get_schedule()) == 1
+        for i in range(5):
+            facility.add_transaction(self.create_trxn(Constants.pmt_type_ETC))
+            facility.advance_time_facility()
+        assert facility.get_lane_queue()[2] == 0
+        assert facility.get_schedule() == []
+        facility.add_transaction(self.create_trxn(Constants.pmt_type_ETC))
+        assert facility.get_lane_queue()[2] == 1
+
+    def test_close_drain(self):
+        """Validate closed lane drains and receives no transactions"""
+        facility = self.create_facility([(1, 'GEN'), (2, 'GEN')])
+        for i in range(4):
+            facility.add_transaction_to_lane(self.create_trxn(Constants.pmt_type_ETC), 1)
+        facility.schedule_lane_close(Constants.datetime_midnight, 1)
+        facility.add_transaction(self.create_trxn(Constants.pmt_type_ETC))
+        assert facility.get_lane_queue() == {1: 4, 2: 1}
+        for i in range(4 * (5 + 4 * 1)):
+            facility.advance_time_facility()
+        assert facility.get_lane_queue()[1] == 0
+
+    def test_close_redistribute(self):
+        """Validate waiting transactions move when lane closes"""
+        facility = self.create_facility([(1, 'GEN'), (2, 'GEN')])
+        for i in range(4):
+            facility.add_transaction_to_lane(self.create_trxn(Constants.pmt_type_ETC), 1)
+        facility.close_lane(1, redistribute=True)
+        assert facility.get_lane_queue() == {1: 1, 2: 3}
+
+    def test_close_redistribute_no_lane(self):
+        """Validate TypeError and lane stays open when no lane can take queue"""
+        facility = self.create_facility([(1, 'GEN'), (2, 'ETC')])
+        for i in range(3):
+            facility.add_transaction_to_lane(self.create_trxn(Constants.pmt_type_cash), 1)
+        with pytest.raises(TypeError):
+            facility.close_lane(1, redistribute=True)
+        assert facility.get_lane(1).is_open()
+        assert facility.get_lane_queue()[1] == 3
+
+    def test_scheduled_close_redistribute_no_lane(self):
+        """Validate scheduled close drains a queue that has nowhere else to go"""
+        facility = self.create_facility([(1, 'GEN'), (2, 'ETC')])
+        for i in range(3):
+            facility.add_transaction_to_lane(self.create_trxn(Constants.pmt_type_cash), 1)
+        close_time = Constants.datetime_midnight + datetime.timedelta(seconds=2)
+        facility.schedule_lane_close(close_time, 1, redistribute=True)
+        for i in range(3):
+            facility.advance_time_facility()
+        assert not facility.get_lane(1).is_open()
+        assert facility.get_lane_queue()[1] == 3
+        assert facility.get_schedule() == []
+        assert len(facility.get_queue_summary()) == 3
+
+    def test_schedule_unknown_lane(self):
+        """Validate ValueError scheduling changes to lanes that will not exist"""
+        facility = self.create_facility([(1, 'GEN')])
+        with pytest.raises(ValueError):
+            facility.schedule_lane_close(Constants.datetime_midnight, 2)
+        with pytest.raises(ValueError):
+            facility.schedule_lane_type_change(Constants.datetime_midnight, 2, 'ETC')
+        with pytest.raises(ValueError):
+            facility.schedule_lane_open(Constants.datetime_midnight, toll_queue.Lane(1, 'ETC'))
+        assert facility.get_schedule() == []
+
+    def test_failed_change_leaves_step_untaken(self):
+        """Validate a scheduled change that fails leaves the Facility unchanged"""
+        facility = self.create_facility([(1, 'GEN')])
+        facility.add_transaction(self.create_trxn(Constants.pmt_type_cash))
+        facility.schedule_lane_open(Constants.datetime_midnight +
+                                    datetime.timedelta(seconds=5), toll_queue.Lane(2, 'GEN'))
+        facility.schedule_lane_type_change(Constants.datetime_midnight +
+                                           datetime.timedelta(seconds=1), 2, 'ETC')
+        with pytest.raises(ValueError):
+            facility.advance_time_facility()
+        assert facility.get_current_time() == Constants.datetime_midnight
+        assert facility.get_queue_summary() == {}
+        assert facility.get_lane(1).get_queue()[0].get_wait_time() is None
+        assert len(facility.get_schedule()) == 2
+
+    def test_type_change(self):
+        """Validate routing follows lane type change"""
+        facility = self.create_facility([(1, 'GEN'), (2, 'ETC')])
+        facility.schedule_lane_type_change(
+            Constants.datetime_midnight + datetime.timedelta(seconds=1), 2, 'CASH')
+        facility.add_transaction(self.create_trxn(Constants.pmt_type_ETC))
+        facility.add_transaction(self.create_trxn(Constants.pmt_type_ETC))
+        assert facility.get_lane_queue()[2] >= 1
+        facility.advance_time_facility()
+        assert facility.get_lane(2).get_lane_type() == 'CASH'
+        facility.close_lane(1)
+        with pytest.raises(TypeError):
+            facility.add_transaction(self.create_trxn(Constants.pmt_type_ETC))
+        facility.add_transaction(self.create_trxn(Constants.pmt_type_cash))
+
+
+    def test_copy(self):
+        """Validate Facility copy keeps state and schedule but not history"""
+        facility = self.create_facility([(1, 'GEN'), (2, 'GEN')])
+        for i in range(4):
+            facility.add_transaction(self.create_trxn(Constants.pmt_type_cash))
+        facility.advance_time_facility()
+        facility.schedule_lane_close(Constants.datetime_midnight +
+                                     datetime.timedelta(seconds=5), 2)
+        copy = facility.copy()
+        assert copy.get_current_time() == facility.get_current_time()
+        assert copy.get_lane_queue() == facility.get_lane_queue()
+        assert copy.get_total_wait_time() == facility.get_total_wait_time()
+        assert copy.get_queue_summary() == {}
+        for i in range(5):
+            copy.advance_time_facility()
+        copy.add_transaction(self.create_trxn(Constants.pmt_type_cash))
+        assert not copy.get_lane(2).is_open()
+        assert facility.get_lane(2).is_open()
+        assert facility.get_lane(1).get_queue_length() == 2
+
+
+class Test_CommonRandomNumbers():
+    """Validate common random numbers and antithetic draws"""
+
+    def create_trxn(self, pmt_type, trx_id):
+        """:returns: Transaction starting at midnight"""
+        return toll_queue.Transaction(Constants.datetime_midnight, pmt_type,
+                                      Constants.axel_cnt_2, trx_id)
+
+    def test_same_vehicle_same_draw(self):
+        """Validate transaction ID gives the same draw across lanes and models"""
+        lane_1 = toll_queue.Lane(1, 'GEN', toll_queue.ServiceTimeModel(seed=7))
+        lane_2 = toll_queue.Lane(2, 'GEN', toll_queue.ServiceTimeModel(seed=7))
+        trxn_1 = self.create_trxn(Constants.pmt_type_cash, 42)
+        trxn_2 = self.create_trxn(Constants.pmt_type_cash, 42)
+        lane_1.add_transaction(trxn_1)
+        lane_2.add_transaction(trxn_2)
+        assert trxn_1.get_process_time() == trxn_2.get_process_time()
+
+    def test_different_vehicles_differ(self):
+        """Validate different transaction IDs and seeds give different draws"""
+        model = toll_queue.ServiceTimeModel(seed=7)
+        assert model.standard_normal(1) != model.standard_normal(2)
+        assert model.standard_normal('a') == model.standard_normal('a')
+        assert toll_queue.ServiceTimeModel(seed=8).standard_normal(1) != \
+            model.standard_normal(1)
+
+    def test_antithetic(self):
+        """Validate antithetic draws mirror around the mean"""
+        model = toll_queue.ServiceTimeModel(seed=3)
+        antithetic = model.antithetic_copy()
+        assert antithetic.get_common_random_numbers() == (3, True)
+        for trx_id in range(10):
+            time_1 = model.processing_time('ETC', 'ETC', stream_key=trx_id)
+            time_2 = antithetic.processing_time('ETC', 'ETC', stream_key=trx_id)
+            assert (time_1 + time_2).total_seconds() == pytest.approx(2 * 5)
+
+    def test_antithetic_requires_seed(self):
+        """Validate ValueError for antithetic draws without a seed"""
+        with pytest.raises(ValueError):
+            toll_queue.ServiceTimeModel(antithetic=True)
+
+    def test_batch_matches_single(self):
+        """Validate batch sampling uses the same streams"""
+        model = toll_queue.ServiceTimeModel(seed=11)
+        draws = model.sample_seconds(['CC', 'ETC'], ['GEN', 'ETC'],
+                                     stream_keys=[5, 6])
+        single = model.processing_time('ETC', 'ETC', stream_key=6)
+        assert draws[1] == pytest.approx(single.total_seconds())
+
+
+class Test_RollingWindow():
+    """Validate incrementally maintained rolling KPIs"""
+
+    windows = [datetime.timedelta(seconds=10), datetime.timedelta(seconds=60)]
+
+    def create_trxn(self, trx_id):
+        """:returns: cash Transaction starting at midnight"""
+        return toll_queue.Transaction(Constants.datetime_midnight,
+                                      Constants.pmt_type_cash, Constants.axel_cnt_2, trx_id)
+
+    def test_matches_recomputed(self):
+        """Validate rolling means and maxima match values over each window"""
+        rolling_window = toll_queue.RollingWindow(self.windows, series=2)
+        samples = []
+        for i in range(3000):
+            sample = [random.randint(0, 20), random.random()]
+            samples.append(sample)
+            rolling_window.add(Constants.datetime_midnight +
+                               datetime.timedelta(seconds=i), sample)
+            for window in self.windows:
+                recent = samples[-int(window.total_seconds()):]
+                for series in range(2):
+                    values = [value[series] for value in recent]
+                    assert rolling_window.get_maxima(window)[series] == max(values)
+                    assert rolling_window.get_means(window)[series] == \
+                        pytest.approx(sum(values) / len(values))
+
+    def test_add_series(self):
+        """Validate series added later count as 0 before they were added"""
+        rolling_window = toll_queue.RollingWindow(self.windows)
+        for i in range(5):
+            rolling_window.add(Constants.datetime_midnight +
+                               datetime.timedelta(seconds=i), [4])
+        rolling_window.add_series()
+        rolling_window.add(Constants.datetime_midnight +
+                           datetime.timedelta(seconds=5), [4, 6])
+        assert list(rolling_window.get_means(self.windows[0])) == [4, 1]
+        assert rolling_window.get_maxima(self.windows[0]) == [4, 6]
+
+    def test_facility_kpis(self):
+        """Validate Facility rolling KPIs by lane and facility mid-run"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        facility.set_rolling_windows(self.windows, interval=datetime.timedelta(seconds=30))
+        facility.add_lane(toll_queue.Lane(1, 'GEN'))
+        for i in range(10):
+            facility.add_transaction(self.create_trxn(i))
+        for i in range(60):
+            facility.advance_time_facility()
+        facility.add_lane(toll_queue.Lane(2, 'GEN'))
+        facility.advance_time_facility()
+
+        kpis = facility.get_rolling_kpis()
+        assert set(kpis) == {'Total', 1, 2}
+        queue_lengths = [value[0] for value in facility.get_queue_summary().values()]
+        assert kpis['Total']['Queue_Length_Max_1min'] == max(queue_lengths[-60:])
+        assert kpis['Total']['Queue_Length_Mean_10s'] == \
+            pytest.approx(sum(queue_lengths[-10:]) / 10)
+        assert kpis[1]['Queue_Length_Max_10s'] == max(queue_lengths[-10:])
+        assert kpis[2]['Queue_Length_Max_1min'] == 0
+
+        rolling_summary = facility.get_rolling_summary_dataframe()
+        assert list(rolling_summary.index.unique()) == \
+            [Constants.datetime_midnight + datetime.timedelta(seconds=30),
+             Constants.datetime_midnight + datetime.timedelta(seconds=60)]
+        assert list(rolling_summary.columns[:3]) == \
+            ['Lane', 'Queue_Length_Mean_10s', 'Queue_Length_Max_10s']
+
+    def test_disabled(self):
+        """Validate rolling KPIs are off by default and can be turned off"""
+        facility = toll_queue.Facility(Constants.datetime_midnight)
+        assert facility.get_rolling_windows() == []
+        facility.set_rolling_windows()
+        assert facility.get_rolling_windows() == [datetime.timedelta(minutes=1),
+                                                  datetime.timedelta(minutes=5),
+                                                  datetime.timedelta(minutes=15)]
+        facility.set_rolling_windows([])
+        facility.add_lane(toll_queue.Lane(1, 'GEN'))
+        facility.advance_time_facility()
+        assert facility.get_rolling_kpis() == {}
+        assert facility.copy().get_rolling_windows() == []
+
+
+class Test_Imports():
+    """Validate simulation core imports without rendering dependencies"""
+
+    def test_core_import(self):
+        """Validate importing toll_queue does not load matplotlib, cv2 or pandas"""
+        code = 'import sys, toll_queue; ' \
+               'print(sorted(m for m in ("matplotlib", "cv2", "pandas") if m in sys.modules))'
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert output.stdout.strip() == '[]'
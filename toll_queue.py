@@ -1,15 +1,20 @@
 """
 Toll Booth Queue Simulator
 Author: Eric Knigge
+
+The simulation core only requires numpy. pandas is imported by the methods
+that read or write dataframes, and plotting and video export are in the
+render module.
 """
 import os
+import abc
+import math
+import heapq
+import zlib
 import datetime
+import collections
 import shutil
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-import cv2
-from cv2 import VideoWriter, VideoWriter_fourcc
 
 
 class Transaction:
@@ -28,6 +33,7 @@ class Transaction:
     _time_remaining = None
     _complete = False
     _trx_id = None
+    _wait_time = None
     _datetime_second = datetime.timedelta(seconds=1)
 
     def __init__(self, datetime_created, pmt_type, axel, transaction_id):
@@ -116,6 +122,22 @@ class Transaction:
         """
         return self._processing_time
 
+    def set_wait_time(self, datetime_value):
+        """
+        Set time spent queueing before processing starts
+        :param datetime_value: datetime.timedelta object
+        """
+        if not isinstance(datetime_value, datetime.timedelta):
+            raise TypeError('Invalid value')
+        self._wait_time = datetime_value
+
+    def get_wait_time(self):
+        """
+        :returns: datetime.timedelta time spent queueing before processing
+            starts, or None if processing has not started
+        """
+        return self._wait_time
+
     def set_time_remaining_trxn(self, date_time_value):
         """
         Set remaining time
@@ -129,6 +151,18 @@ class Transaction:
         #   raise TypeError('Invalid Input Type')
         self._time_remaining = date_time_value
 
+    def copy(self):
+        """
+        :returns: Transaction with the same attributes and progress
+        """
+        transaction = Transaction(self._date_time, self._pmt_type, self._axel,
+                                  self._trx_id)
+        transaction._processing_time = self._processing_time
+        transaction._time_remaining = self._time_remaining
+        transaction._complete = self._complete
+        transaction._wait_time = self._wait_time
+        return transaction
+
     def __str__(self):
         out = ''
         out += 'Transaction Information ' + '\n'
@@ -147,66 +181,83 @@ class Lane:
 
     :param lane_id: unique lane ID number
     :param lane_type: String of lane type, must be contained in Util types
+    :param service_time_model: ServiceTimeModel used for processing times.
+        Default is a model with the normal distribution parameters below.
     """
     _queue = []
     _lane_type = None
     _lane_id = None
-
-    def __init__(self, lane_id, lane_type):
+    _open = True
+    _wait_time = None
+
+    # mean and standard deviation, in seconds, of the processing time for
+    # each (payment type, lane type) pair
+    _processing_time_parameters = {
+        ('CASH', 'GEN'): (13.5, 2.5),
+        ('CC', 'GEN'): (13, 2.5),
+        ('CC', 'CC'): (13, 2.5),
+        ('ETC', 'ETC'): (5, 1),
+        ('PMB', 'GEN'): (7, 1),
+        ('ETC', 'GEN'): (6, 1),
+        ('CASH', 'CASH'): (13.5, 2.5),
+        ('PMB', 'PMB'): (7, 1),
+        ('PBM', 'GEN'): (7, 1),
+        ('PBM', 'PBM'): (7, 1),
+        # vehicles without a transponder pass ETC lanes at ETC speed and are
+        # billed by mail from the plate read
+        ('PBM', 'ETC'): (5, 1),
+        ('PMB', 'ETC'): (5, 1),
+    }
+
+    def __init__(self, lane_id, lane_type, service_time_model=None):
         self._queue = []
         self._lane_type = None
         self._lane_id = None
+        self._service_time_model = None
+        self._open = True
+        self._wait_time = datetime.timedelta(seconds=0)
 
         self.set_lane_type(lane_type)
         self.set_lane_id(lane_id)
+        if service_time_model is None:
+            service_time_model = ServiceTimeModel()
+        self.set_service_time_model(service_time_model)
 
     def get_wait_time(self):
         """
-        Uses current lane queue to calculate wait time
+        Total time remaining of transactions in the lane queue. Kept up to
+        date as transactions are added, processed and removed.
 
         :returns: datetime.timedelta wait time for lane
         """
-        out = datetime.timedelta(seconds=0)
-        for transaction in self._queue:
-            out += transaction.get_time_remaining_trxn()
-        return out
+        return self._wait_time
 
     def set_processing_time_lane_and_trxn(self, transaction):
         """
-        Set processing time for various types of transactions. Matches
-        processing time to transaction and lane type.
+        Set processing time for various types of transactions. Looks up the
+        processing time distribution for the transaction and lane type in
+        the lane ServiceTimeModel. A transaction that already has a processing
+        time keeps it when the model has no entry for the pair.
 
         :param transaction: Transaction object
         :returns: None
         :raises TypeError: Transaction Class Type Required
+        :raises ValueError: no processing time for transaction and lane type
         """
 
         if not isinstance(transaction, Transaction):
             raise TypeError('Invalid Input')
 
-        # credit in credit lane
-        if transaction.get_type() == 'CC' and self.get_lane_type() == 'CC':
-            transaction.set_processing_time_trxn(self.processing_time_credit_credit_lane())
-
-        # tag only lane
-        elif transaction.get_type() == 'ETC' and self.get_lane_type() == 'ETC':
-            transaction.set_processing_time_trxn(self.processing_time_etc_etc_lane())
-
-        # cash in general lane
-        elif transaction.get_type() == 'CASH' and self.get_lane_type() == 'GEN':
-            transaction.set_processing_time_trxn(self.processing_time_cash_gen_lane())
-
-        # credit in general lane
-        elif transaction.get_type() == 'CC' and self.get_lane_type() == 'GEN':
-            transaction.set_processing_time_trxn(self.processing_time_credit_gen_lane())
-
-        # pay-by mail general
-        elif transaction.get_type() == 'PMB' and self.get_lane_type() == 'GEN':
-            transaction.set_processing_time_trxn(self.processing_time_mail_gen_lane())
-
-        # tag general lane
-        elif transaction.get_type() == 'ETC' and self.get_lane_type() == 'GEN':
-            transaction.set_processing_time_trxn(self.processing_time_etc_gen_lane())
+        try:
+            process_time = self._service_time_model.processing_time(
+                transaction.get_type(), self.get_lane_type(),
+                transaction.get_axels(), stream_key=transaction.get_trx_id())
+        except ValueError:
+            # keep a processing time that was assigned before queueing
+            if transaction.get_process_time() is None:
+                raise
+            return
+        transaction.set_processing_time_trxn(process_time)
 
     def set_lane_id(self, lane_id):
         """
@@ -244,71 +295,93 @@ class Lane:
         """
         return len(self._queue)
 
-    def processing_time_cash_gen_lane(self):
+    def processing_time_cash_gen_lane(self, stream_key=None):
         """
         Calculates processing time for cash in general purpose
-        manual toll lane. Utilizes normal probaility distribution.
-        Mean 13.5, stdev 2.5.
+        manual toll lane. Drawn from the lane ServiceTimeModel,
+        by default a normal probaility distribution with
+        mean 13.5, stdev 2.5.
 
+        :param stream_key: transaction ID used for common random numbers
         :returns: datetime.timedelta object with processing time in seconds
         """
-        process_time = np.random.normal(loc=13.5, scale=2.5)
-        return datetime.timedelta(seconds=process_time)
+        return self._service_time_model.processing_time('CASH', 'GEN', stream_key=stream_key)
 
-    def processing_time_credit_gen_lane(self):
+    def processing_time_credit_gen_lane(self, stream_key=None):
         """
         Calculates processing time for credit in general purpose
-        manual toll lane. Utilizes normal probaility distribution.
-        Mean 13.5, stdev 2.5.
+        manual toll lane. Drawn from the lane ServiceTimeModel,
+        by default a normal probaility distribution with
+        mean 13.5, stdev 2.5.
 
+        :param stream_key: transaction ID used for common random numbers
         :returns: datetime.timedelta object with processing time in seconds
         """
-        process_time = np.random.normal(loc=13, scale=2.5)
-        return datetime.timedelta(seconds=process_time)
+        return self._service_time_model.processing_time('CC', 'GEN', stream_key=stream_key)
 
-    def processing_time_credit_credit_lane(self):
+    def processing_time_credit_credit_lane(self, stream_key=None):
         """
         Calculates processing time for credit in credit-only manual toll lane.
-        Utilizes normal probaility distribution.
-        Mean 13.0, stdev 2.5.
+        Drawn from the lane ServiceTimeModel,
+        by default a normal probaility distribution with
+        mean 13.0, stdev 2.5.
 
+        :param stream_key: transaction ID used for common random numbers
         :returns: datetime.timedelta object with processing time in seconds
         """
-        process_time = np.random.normal(loc=13, scale=2.5)
-        return datetime.timedelta(seconds=process_time)
+        return self._service_time_model.processing_time('CC', 'CC', stream_key=stream_key)
 
-    def processing_time_etc_etc_lane(self):
+    def processing_time_etc_etc_lane(self, stream_key=None):
         """
         Calculates processing time for ETC in manual toll lane.
-        Utilizes normal probaility distribution.
-        Mean 5, stdev 1.
+        Drawn from the lane ServiceTimeModel,
+        by default a normal probaility distribution with
+        mean 5, stdev 1.
 
+        :param stream_key: transaction ID used for common random numbers
         :returns: datetime.timedelta object with processing time in seconds
         """
-        process_time = np.random.normal(loc=5, scale=1)
-        return datetime.timedelta(seconds=process_time)
+        return self._service_time_model.processing_time('ETC', 'ETC', stream_key=stream_key)
 
-    def processing_time_mail_gen_lane(self):
+    def processing_time_mail_gen_lane(self, stream_key=None):
         """
         Calculates processing time for pay-by-mail transaction in manual toll lane.
-        Utilizes normal probaility distribution.
-        Mean 7.0, stdev 1.0.
+        Drawn from the lane ServiceTimeModel,
+        by default a normal probaility distribution with
+        mean 7.0, stdev 1.0.
 
+        :param stream_key: transaction ID used for common random numbers
         :returns: datetime.timedelta object with processing time in seconds
         """
-        process_time = np.random.normal(loc=7, scale=1)
-        return datetime.timedelta(seconds=process_time)
+        return self._service_time_model.processing_time('PMB', 'GEN', stream_key=stream_key)
 
-    def processing_time_etc_gen_lane(self):
+    def processing_time_etc_gen_lane(self, stream_key=None):
         """
         Calculates processing time for ETC in general purpose manual toll lane.
-        Utilizes normal probaility distribution.
-        Mean 6, stdeev 1.
+        Drawn from the lane ServiceTimeModel,
+        by default a normal probaility distribution with
+        mean 6, stdeev 1.
 
+        :param stream_key: transaction ID used for common random numbers
         :returns: datetime.timedelta object with processing time in seconds
         """
-        process_time = np.random.normal(loc=6, scale=1)
-        return datetime.timedelta(seconds=process_time)
+        return self._service_time_model.processing_time('ETC', 'GEN', stream_key=stream_key)
+
+    def set_service_time_model(self, service_time_model):
+        """
+        Set model used to draw processing times for transactions added to
+        the lane
+        :param service_time_model: ServiceTimeModel object
+        """
+        if not isinstance(service_time_model, ServiceTimeModel):
+            raise TypeError('input not ServiceTimeModel')
+        self._service_time_model = service_time_model
+
+    def get_service_time_model(self):
+        """
+        :returns: ServiceTimeModel object
+        """
+        return self._service_time_model
 
     def set_lane_type(self, lane_type):
         """
@@ -336,18 +409,563 @@ class Lane:
 
         self.set_processing_time_lane_and_trxn(transaction)
         self._queue.append(transaction)
+        self._wait_time += transaction.get_time_remaining_trxn()
+
+    def copy(self):
+        """
+        Copy of the lane and its queue. The copy shares the service time
+        model.
+        :returns: Lane object
+        """
+        lane = Lane(self._lane_id, self._lane_type, self._service_time_model)
+        lane._queue = [transaction.copy() for transaction in self._queue]
+        lane._open = self._open
+        lane._wait_time = self._wait_time
+        return lane
+
+    def is_open(self):
+        """
+        Whether lane accepts new transactions. Closed lanes continue to
+        process transactions already in the queue.
+        :returns: boolean
+        """
+        return self._open
+
+    def set_open(self, is_open):
+        """
+        Open or close lane to new transactions
+        :param is_open: boolean
+        """
+        if not isinstance(is_open, bool):
+            raise TypeError('input not bool')
+        self._open = is_open
+
+    def remove_waiting_transactions(self):
+        """
+        Remove transactions waiting behind the transaction being processed
+        :returns: list of removed Transaction objects
+        """
+        waiting = self._queue[1:]
+        del self._queue[1:]
+        for transaction in waiting:
+            self._wait_time -= transaction.get_time_remaining_trxn()
+        return waiting
 
     def advance_time_lane(self, input_time):
         """
         Advance time for all transactions in lane
         :param input_time: datetime.timedelta value for advancing time
+        :returns: Transaction completed during the time, or None
+        """
+        if not self._queue:
+            return None
+        transaction = self._queue[0]
+        time_remaining = transaction.get_time_remaining_trxn()
+        transaction.advance_time_transaction(time=input_time)
+        if transaction.is_complete():
+            self._wait_time -= time_remaining
+            return self._queue.pop(0)
+        self._wait_time -= input_time
+        return None
+
+
+class ProcessingTimeDistribution(abc.ABC):
+    """
+    Base class for processing time distributions used by ServiceTimeModel.
+    Subclasses map standard normal draws to processing times, so that all
+    distributions can be sampled from the same random numbers.
+
+    :param mean: mean processing time in seconds
+    :param stdev: standard deviation of processing time in seconds
+    """
+    _mean = None
+    _stdev = None
+
+    def __init__(self, mean, stdev):
+        if stdev < 0:
+            raise ValueError('negative standard deviation, invalid input')
+        self._mean = float(mean)
+        self._stdev = float(stdev)
+
+    def get_mean(self):
+        """
+        :returns: float mean processing time in seconds
+        """
+        return self._mean
+
+    def get_variance(self):
+        """
+        :returns: float variance of processing time in seconds squared
+        """
+        return self._stdev ** 2
+
+    @abc.abstractmethod
+    def transform(self, standard_normal):
+        """
+        Maps standard normal draws to processing times.
+
+        :param standard_normal: float or numpy array of standard normal draws
+        :returns: float or numpy array of processing times in seconds
+        """
+
+    def sample(self, size=None, random_state=None):
+        """
+        Draws processing times.
+
+        :param size: int number of draws. Default returns a single float.
+        :param random_state: numpy Generator. Default is the global numpy
+            random state.
+        :returns: float or numpy array of processing times in seconds
+        """
+        if random_state is None:
+            random_state = np.random
+        return self.transform(random_state.standard_normal(size))
+
+
+class NormalDistribution(ProcessingTimeDistribution):
+    """
+    Normal probability distribution of processing time.
+
+    :param mean: mean processing time in seconds
+    :param stdev: standard deviation of processing time in seconds
+    """
+
+    def transform(self, standard_normal):
+        """
+        Maps standard normal draws to processing times.
+
+        :param standard_normal: float or numpy array of standard normal draws
+        :returns: float or numpy array of processing times in seconds
+        """
+        return self._mean + self._stdev * standard_normal
+
+    def __repr__(self):
+        return 'NormalDistribution(' + repr(self._mean) + ', ' + \
+               repr(self._stdev) + ')'
+
+
+class LognormalDistribution(ProcessingTimeDistribution):
+    """
+    Lognormal probability distribution of processing time, parameterized by
+    the mean and standard deviation of the processing time itself.
+
+    :param mean: mean processing time in seconds
+    :param stdev: standard deviation of processing time in seconds
+    """
+    _log_mean = None
+    _log_stdev = None
+
+    def __init__(self, mean, stdev):
+        super().__init__(mean, stdev)
+        if mean <= 0:
+            raise ValueError('lognormal mean must be positive')
+        log_variance = np.log(1 + (stdev / mean) ** 2)
+        self._log_stdev = float(np.sqrt(log_variance))
+        self._log_mean = float(np.log(mean) - log_variance / 2)
+
+    def transform(self, standard_normal):
+        """
+        Maps standard normal draws to processing times.
+
+        :param standard_normal: float or numpy array of standard normal draws
+        :returns: float or numpy array of processing times in seconds
+        """
+        return np.exp(self._log_mean + self._log_stdev * standard_normal)
+
+    def __repr__(self):
+        return 'LognormalDistribution(' + repr(self._mean) + ', ' + \
+               repr(self._stdev) + ')'
+
+
+class EmpiricalDistribution(ProcessingTimeDistribution):
+    """
+    Empirical probability distribution of processing time built from
+    observed processing times. Draws are interpolated between the sorted
+    observations.
+
+    :param samples: list or numpy array of observed processing times in seconds
+    """
+    _samples = None
+    _erf = np.vectorize(math.erf, otypes=[float])
+
+    def __init__(self, samples):
+        samples = np.sort(np.asarray(samples, dtype=float))
+        if samples.size == 0:
+            raise ValueError('empirical distribution requires samples')
+        super().__init__(samples.mean(), samples.std())
+        self._samples = samples
+
+    @classmethod
+    def from_csv(cls, name, column='Processing_Time_Seconds'):
+        """
+        Load observed processing times from a CSV file.
+
+        :param name: CSV file name
+        :param column: column with processing times in seconds
+        :returns: EmpiricalDistribution object
+        """
+        import pandas as pd
+        return cls(pd.read_csv(name)[column].dropna().values)
+
+    def transform(self, standard_normal):
+        """
+        Maps standard normal draws to processing times through the
+        empirical quantile function.
+
+        :param standard_normal: float or numpy array of standard normal draws
+        :returns: float or numpy array of processing times in seconds
+        """
+        probability = 0.5 * (1 + self._erf(np.asarray(standard_normal) / np.sqrt(2)))
+        position = probability * (self._samples.size - 1)
+        out = np.interp(position, np.arange(self._samples.size), self._samples)
+        if np.ndim(out) == 0:
+            return float(out)
+        return out
+
+    def __repr__(self):
+        return 'EmpiricalDistribution(' + repr(self._samples.tolist()) + ')'
+
+
+class ServiceTimeModel:
+    """
+    Lookup table of processing time distributions keyed by (payment type,
+    lane type), with optional per-axle adjustments by lane type. The default
+    table uses the normal distribution parameters of the Lane class.
+
+    By default draws come from the global numpy random state. With common
+    random numbers each transaction draws from its own random stream keyed
+    by the seed and transaction ID, so the same vehicle gets the same draw
+    in every lane configuration run with the same seed. Antithetic mode
+    negates those draws, so a pair of runs with and without it has
+    negatively correlated processing times.
+
+    :param distributions: dictionary of (payment type, lane type) keys and
+        distribution values. Default is the Lane normal distributions.
+    :param seed: int seed for common random numbers. Default is None, which
+        uses the global numpy random state.
+    :param antithetic: boolean, negate common random number draws
+    """
+    _distributions = None
+    _axle_adjustments = None
+    _seed = None
+    _antithetic = False
+
+    def __init__(self, distributions=None, seed=None, antithetic=False):
+        self._distributions = {}
+        self._axle_adjustments = {}
+        self.set_common_random_numbers(seed, antithetic)
+        if distributions is None:
+            distributions = {key: NormalDistribution(mean, stdev) for key, (mean, stdev)
+                             in Lane._processing_time_parameters.items()}
+        for (pmt_type, lane_type), distribution in distributions.items():
+            self.set_distribution(pmt_type, lane_type, distribution)
+
+    def set_distribution(self, pmt_type, lane_type, distribution):
+        """
+        Set processing time distribution for a payment and lane type
+
+        :param pmt_type: String payment type
+        :param lane_type: String lane type
+        :param distribution: ProcessingTimeDistribution object
+        """
+        if pmt_type not in Util().get_lane_types() or \
+                lane_type not in Util().get_lane_types():
+            raise ValueError('Invalid Value, does not match existing lane type')
+        if not isinstance(distribution, ProcessingTimeDistribution):
+            raise TypeError('input not a processing time distribution')
+        self._distributions[(pmt_type, lane_type)] = distribution
+
+    def get_distribution(self, pmt_type, lane_type):
+        """
+        :param pmt_type: String payment type
+        :param lane_type: String lane type
+        :returns: processing time distribution
+        :raises ValueError: no processing time for payment and lane type
         """
         try:
-            self._queue[0].advance_time_transaction(time=input_time)
-            if self._queue[0].is_complete():
-                self._queue.remove(self._queue[0])
-        except IndexError:
-            pass
+            return self._distributions[(pmt_type, lane_type)]
+        except KeyError:
+            raise ValueError('No processing time for ' + str(pmt_type) +
+                             ' transaction in ' + str(lane_type) + ' lane')
+
+    def get_distributions(self):
+        """
+        :returns: dictionary of (payment type, lane type) keys and
+            distribution values
+        """
+        return dict(self._distributions)
+
+    def set_common_random_numbers(self, seed, antithetic=False):
+        """
+        Draw processing times from per-transaction random streams
+
+        :param seed: int seed, or None to use the global numpy random state
+        :param antithetic: boolean, negate draws
+        """
+        if seed is not None and (not isinstance(seed, (int, np.integer)) or seed < 0):
+            raise ValueError('seed must be a non-negative int')
+        if antithetic and seed is None:
+            raise ValueError('antithetic draws require a seed')
+        self._seed = seed
+        self._antithetic = antithetic
+
+    def get_common_random_numbers(self):
+        """
+        :returns: tuple of (seed, antithetic)
+        """
+        return self._seed, self._antithetic
+
+    def copy(self):
+        """
+        :returns: ServiceTimeModel with the same distributions, axle
+            adjustments and random number settings
+        """
+        model = ServiceTimeModel(self._distributions, self._seed, self._antithetic)
+        model._axle_adjustments = self.get_axle_adjustments()
+        return model
+
+    def antithetic_copy(self):
+        """
+        :returns: copy of the model with the antithetic setting reversed
+        """
+        model = self.copy()
+        model.set_common_random_numbers(self._seed, not self._antithetic)
+        return model
+
+    def standard_normal(self, stream_key):
+        """
+        Standard normal draw from the random stream of a transaction
+
+        :param stream_key: transaction ID, int or String
+        :returns: float standard normal draw
+        """
+        if self._seed is None:
+            raise ValueError('common random numbers require a seed')
+        if isinstance(stream_key, (int, np.integer)) and stream_key >= 0:
+            stream_key = int(stream_key)
+        else:
+            stream_key = zlib.crc32(str(stream_key).encode())
+        draw = np.random.default_rng([self._seed, stream_key]).standard_normal()
+        if self._antithetic:
+            return -draw
+        return draw
+
+    def set_axle_adjustment(self, lane_type, seconds_per_axle, standard_axles=2):
+        """
+        Add processing time for each axle above the standard axle count in
+        a lane type, e.g. for collectors checking the fare of larger vehicles.
+
+        :param lane_type: String lane type
+        :param seconds_per_axle: float seconds added per additional axle
+        :param standard_axles: int axle count without adjustment. Default is 2.
+        """
+        if lane_type not in Util().get_lane_types():
+            raise ValueError('Invalid Value, does not match existing lane type')
+        self._axle_adjustments[lane_type] = (float(seconds_per_axle), standard_axles)
+
+    def get_axle_adjustments(self):
+        """
+        :returns: dictionary of (seconds per axle, standard axles) values
+            keyed by lane type
+        """
+        return dict(self._axle_adjustments)
+
+    def get_axle_adjustment(self, lane_type, axles):
+        """
+        :param lane_type: String lane type
+        :param axles: int or numpy array of axle counts
+        :returns: float or numpy array of seconds added to processing time
+        """
+        if lane_type not in self._axle_adjustments:
+            return 0.0
+        seconds_per_axle, standard_axles = self._axle_adjustments[lane_type]
+        return seconds_per_axle * np.maximum(np.asarray(axles) - standard_axles, 0)
+
+    def processing_time(self, pmt_type, lane_type, axles=None, random_state=None,
+                        stream_key=None):
+        """
+        Draw processing time for a single transaction. Negative draws are
+        truncated to zero.
+
+        :param pmt_type: String payment type
+        :param lane_type: String lane type
+        :param axles: int axle count. Default applies no axle adjustment.
+        :param random_state: numpy Generator. Default is the global numpy
+            random state.
+        :param stream_key: transaction ID used for common random numbers
+        :returns: datetime.timedelta processing time
+        """
+        distribution = self.get_distribution(pmt_type, lane_type)
+        if self._seed is not None and stream_key is not None:
+            seconds = distribution.transform(self.standard_normal(stream_key))
+        else:
+            seconds = distribution.sample(random_state=random_state)
+        if axles is not None:
+            seconds += self.get_axle_adjustment(lane_type, axles)
+        return datetime.timedelta(seconds=max(float(seconds), 0.0))
+
+    def sample_seconds(self, pmt_types, lane_types, axles=None, random_state=None,
+                       stream_keys=None):
+        """
+        Draw processing times for a batch of transactions. Each distinct
+        (payment type, lane type) pair is looked up once and sampled as a
+        single array.
+
+        :param pmt_types: sequence of String payment types
+        :param lane_types: sequence of String lane types, same length
+        :param axles: sequence of int axle counts. Default applies no axle
+            adjustment.
+        :param random_state: numpy Generator. Default is the global numpy
+            random state.
+        :param stream_keys: sequence of transaction IDs used for common
+            random numbers, same length
+        :returns: numpy array of processing times in seconds
+        """
+        pmt_types = np.asarray(pmt_types)
+        lane_types = np.asarray(lane_types)
+        if pmt_types.shape != lane_types.shape:
+            raise ValueError('payment and lane types must be the same length')
+        out = np.zeros(pmt_types.shape, dtype=float)
+        pairs = {}
+        for i, key in enumerate(zip(pmt_types.tolist(), lane_types.tolist())):
+            pairs.setdefault(key, []).append(i)
+        for (pmt_type, lane_type), index in pairs.items():
+            distribution = self.get_distribution(pmt_type, lane_type)
+            if self._seed is not None and stream_keys is not None:
+                draws = [self.standard_normal(stream_keys[i]) for i in index]
+                out[index] = distribution.transform(np.asarray(draws))
+            else:
+                out[index] = distribution.sample(size=len(index),
+                                                 random_state=random_state)
+            if axles is not None:
+                out[index] += self.get_axle_adjustment(
+                    lane_type, np.asarray(axles)[index])
+        return np.maximum(out, 0.0)
+
+    def __repr__(self):
+        distributions = ', '.join(repr(key) + ': ' + repr(self._distributions[key])
+                                  for key in sorted(self._distributions))
+        adjustments = ', '.join(repr(key) + ': ' + repr(self._axle_adjustments[key])
+                                for key in sorted(self._axle_adjustments))
+        return 'ServiceTimeModel({' + distributions + '}, axle_adjustments={' + \
+               adjustments + '}, seed=' + repr(self._seed) + ', antithetic=' + \
+               repr(self._antithetic) + ')'
+
+
+class RollingWindow:
+    """
+    Rolling means and maxima of several series sampled together, over one
+    or more time windows. Samples are kept for the longest window only.
+    Each window keeps running sums and the position of its oldest sample,
+    and the maxima of each series come from a deque of samples with
+    decreasing values, so adding a sample takes constant amortised time.
+
+    :param windows: list of datetime.timedelta window lengths
+    :param series: int number of series
+    """
+    # samples dropped from the front of the buffer at once, see add
+    _compact_size = 1024
+
+    def __init__(self, windows, series=1):
+        for window in windows:
+            if not isinstance(window, datetime.timedelta):
+                raise TypeError('invalid input type, must be datetime.timedelta')
+            if window <= datetime.timedelta():
+                raise ValueError('window must be positive')
+        self._windows = list(windows)
+        self._times = []
+        self._rows = []
+        # sample numbers, counted from the first sample ever added
+        self._offset = 0
+        self._starts = [0] * len(self._windows)
+        self._sums = [np.zeros(series) for _ in self._windows]
+        self._maxima = [collections.deque() for _ in range(series)]
+
+    def add(self, time, values):
+        """
+        Add a sample of every series. Samples must be added in time order.
+        :param time: datetime.datetime of the sample
+        :param values: list of int or float values, one per series
+        """
+        row = np.array(values, dtype=float)
+        times = self._times
+        rows = self._rows
+        offset = self._offset
+        times.append(time)
+        rows.append(row)
+        for index, window in enumerate(self._windows):
+            total = self._sums[index]
+            total += row
+            start = self._starts[index]
+            cutoff = time - window
+            while times[start - offset] <= cutoff:
+                total -= rows[start - offset]
+                start += 1
+            self._starts[index] = start
+
+        number = offset + len(rows) - 1
+        oldest = min(self._starts)
+        for maxima, value in zip(self._maxima, values):
+            while maxima and maxima[-1][1] <= value:
+                maxima.pop()
+            maxima.append((number, value))
+            while maxima[0][0] < oldest:
+                maxima.popleft()
+
+        # drop samples older than every window
+        if oldest - offset >= self._compact_size:
+            del times[:oldest - offset]
+            del rows[:oldest - offset]
+            self._offset = oldest
+
+    def add_series(self, count=1):
+        """
+        Add series, with a value of 0 for samples already added
+        :param count: int number of series to add
+        """
+        zeros = np.zeros(count)
+        self._rows = [np.concatenate([row, zeros]) for row in self._rows]
+        self._sums = [np.concatenate([total, zeros]) for total in self._sums]
+        number = self._offset + len(self._rows) - 1
+        for _ in range(count):
+            self._maxima.append(collections.deque([(number, 0)] if self._rows else []))
+
+    def get_windows(self):
+        """
+        :returns: list of datetime.timedelta window lengths
+        """
+        return self._windows
+
+    def get_series_count(self):
+        """
+        :returns: int number of series
+        """
+        return len(self._maxima)
+
+    def get_means(self, window):
+        """
+        :param window: datetime.timedelta window length
+        :returns: numpy array of the mean of each series in the window, 0
+            before any sample
+        """
+        index = self._windows.index(window)
+        count = self._offset + len(self._rows) - self._starts[index]
+        if not count:
+            return np.zeros(len(self._maxima))
+        return self._sums[index] / count
+
+    def get_maxima(self, window):
+        """
+        :param window: datetime.timedelta window length
+        :returns: list of the maximum of each series in the window, 0
+            before any sample
+        """
+        start = self._starts[self._windows.index(window)]
+        output = []
+        for maxima in self._maxima:
+            # the first maximum inside a window is its largest sample
+            output.append(next((value for number, value in maxima if number >= start), 0))
+        return output
 
 
 class Facility:
@@ -364,9 +982,36 @@ class Facility:
     _all_lanes = []
     _trx_ID_counter = 0
     _queue_summary = {}
+    _lane_queue_summary = {}
+    _lane_index = {}
+    _routing_index = {}
+    _schedule = []
+    _schedule_counter = 0
+    _wait_times = []
+    _service_time_model = None
+    _rolling_window = None
+    _rolling_interval = None
+    _rolling_summary = {}
+    _next_rolling_time = None
+    _default_rolling_windows = [datetime.timedelta(minutes=1),
+                                datetime.timedelta(minutes=5),
+                                datetime.timedelta(minutes=15)]
 
     def __init__(self, start_time):
+        self._queue_by_lane = {}
+        self._all_lanes = []
+        self._queue_summary = {}
+        self._lane_queue_summary = {}
+        self._lane_index = {}
+        self._routing_index = {pmt_type: [] for pmt_type in Util().get_lane_types()}
+        self._schedule = []
+        self._schedule_counter = 0
+        self._wait_times = []
+        self._service_time_model = None
+
         self.set_start_time(start_time)
+        # rolling KPIs are off until set_rolling_windows is called
+        self.set_rolling_windows([])
 
     def get_total_wait_time(self):
         """
@@ -380,23 +1025,161 @@ class Facility:
     def update_queue_summary(self):
         """
         Updates queue summary dictionary with total queue length (vehicles)
-        and total wait time.
+        and total wait time, and the lane queue summary with queue length
+        by lane.
         """
         current_time = self.get_current_time()
         queue_length = self.total_queue()
         total_wait_time = self.get_total_wait_time()
         self._queue_summary[current_time] = [queue_length, total_wait_time]
+        self._lane_queue_summary[current_time] = dict(self._queue_by_lane)
+        if self._rolling_window is not None:
+            self.update_rolling_window(queue_length, total_wait_time)
 
-    def export_queue_summary_to_csv(self, name='queue_summary.csv'):
+    def update_rolling_window(self, queue_length, total_wait_time):
         """
-        Writes toll queue summary to CSV file
+        Add queue length and wait time of the facility and each lane to the
+        rolling windows, and record the rolling KPIs at each rolling
+        interval.
+        :param queue_length: int total queue length
+        :param total_wait_time: datetime.timedelta total wait time
+        """
+        # facility values first, then queue length and wait time by lane
+        values = [queue_length, total_wait_time.total_seconds()]
+        for lane in self._all_lanes:
+            values.append(lane.get_queue_length())
+            values.append(lane.get_wait_time().total_seconds())
+        new_series = len(values) - self._rolling_window.get_series_count()
+        if new_series:
+            self._rolling_window.add_series(new_series)
+
+        current_time = self.get_current_time()
+        self._rolling_window.add(current_time, values)
+        if self._next_rolling_time is None:
+            self._next_rolling_time = self._start_time + self._rolling_interval
+        if current_time >= self._next_rolling_time:
+            self._rolling_summary[current_time] = self.get_rolling_kpis()
+            self._next_rolling_time = current_time + self._rolling_interval
+
+    def set_rolling_windows(self, windows=None, interval=datetime.timedelta(minutes=1)):
+        """
+        Turn on rolling KPIs, clearing the rolling KPIs recorded so far.
+        An empty list turns rolling KPIs off. Rolling KPIs add about a third
+        to the time of each step, so they are off by default.
+        :param windows: list of datetime.timedelta window lengths. Default
+            is 1, 5 and 15 minutes.
+        :param interval: datetime.timedelta between recorded rolling KPIs
+        """
+        if windows is None:
+            windows = self._default_rolling_windows
+        if not isinstance(interval, datetime.timedelta):
+            raise TypeError('invalid input type, must be datetime.timedelta')
+        if interval <= datetime.timedelta():
+            raise ValueError('interval must be positive')
+        self._rolling_window = None
+        if windows:
+            # facility queue length and wait time, lanes are added later
+            self._rolling_window = RollingWindow(windows, series=2)
+        self._rolling_interval = interval
+        self._rolling_summary = {}
+        self._next_rolling_time = None
+
+    def get_rolling_windows(self):
+        """
+        :returns: list of datetime.timedelta rolling KPI window lengths
+        """
+        if self._rolling_window is None:
+            return []
+        return self._rolling_window.get_windows()
+
+    def get_rolling_kpis(self):
+        """
+        Current rolling KPIs, e.g. 'Queue_Length_Mean_5min' and
+        'Wait_Time_Seconds_Max_15min', for each window.
+
+        :returns: Dictionary object of KPI dictionaries keyed by lane ID,
+            with 'Total' for the facility
+        """
+        if self._rolling_window is None:
+            return {}
+        keys = ['Total'] + [lane.get_lane_id() for lane in self._all_lanes]
+        kpis = {key: {} for key in keys}
+        for window in self._rolling_window.get_windows():
+            label = self._window_label(window)
+            means = self._rolling_window.get_means(window)
+            maxima = self._rolling_window.get_maxima(window)
+            for index, key in enumerate(keys):
+                kpi = kpis[key]
+                kpi['Queue_Length_Mean_' + label] = float(means[2 * index])
+                kpi['Queue_Length_Max_' + label] = maxima[2 * index]
+                kpi['Wait_Time_Seconds_Mean_' + label] = float(means[2 * index + 1])
+                kpi['Wait_Time_Seconds_Max_' + label] = maxima[2 * index + 1]
+        return kpis
+
+    def get_rolling_summary(self):
+        """
+        :returns: Dictionary object of rolling KPIs, see get_rolling_kpis,
+            keyed by datetime, recorded every rolling interval
+        """
+        return self._rolling_summary
+
+    def get_rolling_summary_dataframe(self):
+        """
+        :returns: dataframe of the rolling summary indexed by datetime with
+            a Lane column ('Total' for the facility) and one column per KPI
+        """
+        import pandas as pd
+        rows = []
+        index = []
+        for time, kpis in self._rolling_summary.items():
+            for key, kpi in kpis.items():
+                index.append(time)
+                rows.append(dict(kpi, Lane=key))
+        df_out = pd.DataFrame(rows, index=index)
+        if rows:
+            df_out = df_out[['Lane'] + [column for column in df_out.columns
+                                        if column != 'Lane']]
+        return df_out
+
+    def export_rolling_summary_to_csv(self, name='rolling_summary.csv'):
         """
+        Writes rolling KPI summary to CSV file
+        """
+        self.get_rolling_summary_dataframe().to_csv(name)
+
+    def _window_label(self, window):
+        seconds = int(window.total_seconds())
+        if seconds % 60 == 0:
+            return str(seconds // 60) + 'min'
+        return str(seconds) + 's'
+
+    def get_queue_summary_dataframe(self):
+        """
+        :returns: dataframe of the queue summary indexed by datetime with
+            Queue_Length and Total_Wait_Time_Seconds columns
+        """
+        import pandas as pd
         dict_index = list(self._queue_summary)
         dict_values = self._queue_summary.values()
         column_names = ['Queue_Length', 'Total_Wait_Time_Seconds']
         df_out = pd.DataFrame(data=dict_values, index=dict_index,
                               columns=column_names)
         df_out['Total_Wait_Time_Seconds'] = df_out['Total_Wait_Time_Seconds'].dt.seconds
+        return df_out
+
+    def export_queue_summary_to_csv(self, name='queue_summary.csv'):
+        """
+        Writes toll queue summary to CSV file
+        """
+        self.get_queue_summary_dataframe().to_csv(name)
+
+    def export_lane_queue_summary_to_csv(self, name='lane_queue_summary.csv'):
+        """
+        Writes queue length by lane to CSV file, one column per lane
+        """
+        import pandas as pd
+        df_out = pd.DataFrame.from_dict(self._lane_queue_summary, orient='index')
+        df_out.columns = ['Lane_' + str(lane_id) for lane_id in df_out.columns]
         df_out.to_csv(name)
 
     def add_lane(self, lane):
@@ -408,7 +1191,67 @@ class Facility:
             raise TypeError('Incorrect type')
         if lane in self._all_lanes:
             raise ValueError('Lane already exists in system')
+        if lane.get_lane_id() in self._lane_index:
+            raise ValueError('Lane ID already exists in system')
+        if self._service_time_model is not None:
+            lane.set_service_time_model(self._service_time_model)
         self._all_lanes.append(lane)
+        self._lane_index[lane.get_lane_id()] = lane
+        if lane.is_open():
+            self._add_lane_to_routing(lane)
+
+    def copy(self):
+        """
+        Copy of the current Facility state: lanes, queued transactions and
+        scheduled lane changes. Queue summaries and wait times are not
+        copied, so the copy starts fresh at the current time.
+        :returns: Facility object
+        """
+        facility = Facility(self._current_time)
+        facility._service_time_model = self._service_time_model
+        facility.set_rolling_windows(self.get_rolling_windows(), self._rolling_interval)
+        lane_copies = {}
+        for lane in self._all_lanes:
+            lane_copies[id(lane)] = lane.copy()
+            facility.add_lane(lane_copies[id(lane)])
+
+        # scheduled changes act on the copy and its lanes
+        for time, counter, action, args in self._schedule:
+            args = tuple((lane_copies.get(id(arg)) or arg.copy())
+                         if isinstance(arg, Lane) else arg for arg in args)
+            facility._schedule.append((time, counter, getattr(facility, action.__name__), args))
+        heapq.heapify(facility._schedule)
+        facility._schedule_counter = self._schedule_counter
+        return facility
+
+    def get_lane(self, lane_id):
+        """
+        :param lane_id: int lane ID
+        :returns: Lane object with matching lane ID
+        :raises ValueError: no lane with lane ID
+        """
+        try:
+            return self._lane_index[lane_id]
+        except KeyError:
+            raise ValueError('No lane with ID ' + str(lane_id))
+
+    def set_service_time_model(self, service_time_model):
+        """
+        Set processing time model for all lanes, including lanes added later
+        :param service_time_model: ServiceTimeModel object
+        """
+        if not isinstance(service_time_model, ServiceTimeModel):
+            raise TypeError('Incorrect type')
+        self._service_time_model = service_time_model
+        for lane in self._all_lanes:
+            lane.set_service_time_model(service_time_model)
+
+    def get_service_time_model(self):
+        """
+        :returns: ServiceTimeModel set for the facility, or None when lanes
+            use their own models
+        """
+        return self._service_time_model
 
     def advance_time_facility(self, input_time=datetime.timedelta(seconds=1)):
         """
@@ -416,16 +1259,31 @@ class Facility:
         and for facility time.
         :param input_time: datetime.timedelta value for advancing time.
         Default value is 1 second.
+        :returns: list of Transaction objects completed during the time
         """
+        # apply lane changes scheduled up to the new time before anything
+        # moves, so a change that fails leaves the step untaken
+        start_time = self._current_time
+        self.apply_schedule(start_time + input_time)
+
         # advance time for facility
-        self._current_time = self._current_time + input_time
+        self._current_time = start_time + input_time
 
         # advance time for first transaction in lane
+        completed = []
         for lane in self._all_lanes:
-            lane.advance_time_lane(input_time=input_time)
+            queue = lane.get_queue()
+            # the wait ends when processing starts, at the head of the queue
+            if queue and queue[0].get_wait_time() is None:
+                queue[0].set_wait_time(self._time_since_created(queue[0], start_time))
+            transaction = lane.advance_time_lane(input_time=input_time)
+            if transaction is not None:
+                completed.append(transaction)
+                self._wait_times.append(transaction.get_wait_time())
 
         # update queue summary
         self.update_queue_summary()
+        return completed
 
     def add_transaction(self, transaction):
         """
@@ -439,12 +1297,8 @@ class Facility:
         if not isinstance(transaction, Transaction):
             raise TypeError('Incorrect type')
 
-        # create list with matching lane type or GEN lane
-        possible_lane = []
-        for lane in self._all_lanes:
-            if lane.get_lane_type() == transaction.get_type() or \
-                    lane.get_lane_type() == 'GEN':
-                possible_lane.append(lane)
+        # open lanes with matching lane type or GEN lane
+        possible_lane = self._routing_index[transaction.get_type()]
 
         # raise error if no matching lane
         if not possible_lane:
@@ -459,6 +1313,188 @@ class Facility:
         # add to fastest lane
         fastest_lane.add_transaction(transaction)
 
+    def get_eligible_lanes(self, pmt_type):
+        """
+        :param pmt_type: String payment type
+        :returns: list of open Lane objects that can process the payment
+            type, in the order lanes were added
+        :raises ValueError: unknown payment type
+        """
+        try:
+            return list(self._routing_index[pmt_type])
+        except KeyError:
+            raise ValueError('Invalid Value, does not match existing payment type')
+
+    def add_transaction_to_lane(self, transaction, lane_id):
+        """
+        Add transaction directly to a lane, without checking eligibility or
+        comparing wait times. Used to replay the lane each vehicle used.
+
+        :param transaction: Transaction object
+        :param lane_id: int lane ID
+        """
+        if not isinstance(transaction, Transaction):
+            raise TypeError('Incorrect type')
+        self.get_lane(lane_id).add_transaction(transaction)
+
+    def open_lane(self, lane):
+        """
+        Open lane to new transactions. A lane not yet in the Facility
+        is added.
+        :param lane: Lane object
+        """
+        if not isinstance(lane, Lane):
+            raise TypeError('Incorrect type')
+        if lane not in self._all_lanes:
+            lane.set_open(True)
+            self.add_lane(lane)
+        elif not lane.is_open():
+            lane.set_open(True)
+            self._add_lane_to_routing(lane)
+
+    def close_lane(self, lane_id, redistribute=False):
+        """
+        Close lane to new transactions. By default the queue drains through
+        the closed lane. With *redistribute* the transactions waiting behind
+        the one being processed are moved to the shortest open eligible
+        queues.
+
+        :param lane_id: int lane ID
+        :param redistribute: boolean, move waiting transactions
+        :raises TypeError: No applicable lane to process trxn
+        """
+        lane = self.get_lane(lane_id)
+        if not lane.is_open():
+            return
+        lane.set_open(False)
+        self._remove_lane_from_routing(lane)
+        if not redistribute:
+            return
+
+        # check every waiting transaction has somewhere to go before moving
+        for transaction in lane.get_queue()[1:]:
+            if not self._routing_index[transaction.get_type()]:
+                lane.set_open(True)
+                self._add_lane_to_routing(lane)
+                raise TypeError('No applicable lane to process trxn')
+        for transaction in lane.remove_waiting_transactions():
+            self.add_transaction(transaction)
+
+    def change_lane_type(self, lane_id, lane_type):
+        """
+        Change lane type. Transactions already in the queue keep their
+        processing times.
+
+        :param lane_id: int lane ID
+        :param lane_type: String, valid lane type
+        """
+        lane = self.get_lane(lane_id)
+        if lane.is_open():
+            self._remove_lane_from_routing(lane)
+        lane.set_lane_type(lane_type)
+        if lane.is_open():
+            self._add_lane_to_routing(lane)
+
+    def schedule_lane_open(self, time, lane):
+        """
+        Schedule lane opening, see open_lane
+        :param time: datetime.datetime when lane opens
+        :param lane: Lane object
+        """
+        if not isinstance(lane, Lane):
+            raise TypeError('Incorrect type')
+        if lane not in self._all_lanes and lane.get_lane_id() in self._lane_index:
+            raise ValueError('Lane ID already exists in system')
+        self._add_schedule(time, self.open_lane, (lane,))
+
+    def schedule_lane_close(self, time, lane_id, redistribute=False):
+        """
+        Schedule lane closure, see close_lane. When a waiting transaction has
+        no other open eligible lane at that time, the queue drains through
+        the closed lane instead of being redistributed.
+        :param time: datetime.datetime when lane closes
+        :param lane_id: int lane ID
+        :param redistribute: boolean, move waiting transactions
+        :raises ValueError: lane ID not in the Facility or scheduled to open
+        """
+        self._check_scheduled_lane_id(lane_id)
+        self._add_schedule(time, self.close_lane, (lane_id, redistribute))
+
+    def schedule_lane_type_change(self, time, lane_id, lane_type):
+        """
+        Schedule lane type change, see change_lane_type
+        :param time: datetime.datetime when lane type changes
+        :param lane_id: int lane ID
+        :param lane_type: String, valid lane type
+        :raises ValueError: invalid lane type, or lane ID not in the Facility
+            or scheduled to open
+        """
+        if lane_type not in Util().get_lane_types():
+            raise ValueError('Invalid Value, does not match existing lane type')
+        self._check_scheduled_lane_id(lane_id)
+        self._add_schedule(time, self.change_lane_type, (lane_id, lane_type))
+
+    def apply_schedule(self, time=None):
+        """
+        Apply scheduled lane changes due at or before *time*, in time order.
+        A change leaves the schedule only once applied, so a change that
+        raises stays scheduled after the changes before it.
+        :param time: datetime.datetime, default is the current time
+        """
+        if time is None:
+            time = self._current_time
+        while self._schedule and self._schedule[0][0] <= time:
+            _, _, action, args = self._schedule[0]
+            try:
+                action(*args)
+            except TypeError:
+                if action.__name__ != 'close_lane':
+                    raise
+                # a scheduled close goes ahead, draining a queue that has
+                # nowhere else to go
+                action(args[0])
+            heapq.heappop(self._schedule)
+
+    def get_schedule(self):
+        """
+        :returns: list of (datetime, action name, arguments) tuples for
+            lane changes not yet applied, in time order
+        """
+        return [(time, action.__name__, args)
+                for time, _, action, args in sorted(self._schedule)]
+
+    def _check_scheduled_lane_id(self, lane_id):
+        if lane_id in self._lane_index:
+            return
+        for _, _, action, args in self._schedule:
+            if action.__name__ == 'open_lane' and args[0].get_lane_id() == lane_id:
+                return
+        raise ValueError('No lane with ID ' + str(lane_id))
+
+    def _add_schedule(self, time, action, args):
+        if not isinstance(time, datetime.datetime):
+            raise TypeError('invalid input type, must be datetime.datetime')
+        # changes scheduled at or before the current time apply immediately
+        heapq.heappush(self._schedule,
+                       (time, self._schedule_counter, action, args))
+        self._schedule_counter += 1
+        self.apply_schedule()
+
+    def _add_lane_to_routing(self, lane):
+        """
+        Add lane to the eligible lanes of each payment type it accepts,
+        keeping the order lanes were added to the Facility.
+        """
+        for pmt_type, lanes in self._routing_index.items():
+            if lane.get_lane_type() == pmt_type or lane.get_lane_type() == 'GEN':
+                lanes.append(lane)
+                lanes.sort(key=self._all_lanes.index)
+
+    def _remove_lane_from_routing(self, lane):
+        for lanes in self._routing_index.values():
+            if lane in lanes:
+                lanes.remove(lane)
+
     def total_queue(self):
         """
         :returns: int of total queue length
@@ -485,6 +1521,49 @@ class Facility:
         self.calculate_queue_by_lane()
         return self._queue_by_lane
 
+    def get_queue_summary(self):
+        """
+        :returns: Dictionary object with [queue length, total wait time]
+            values keyed by datetime
+        """
+        return self._queue_summary
+
+    def get_wait_times(self):
+        """
+        :returns: list of datetime.timedelta wait times of completed
+            transactions, in order of completion
+        """
+        return self._wait_times
+
+    def get_queued_wait_times(self):
+        """
+        :returns: list of datetime.timedelta wait times of transactions
+            still in the lanes, the recorded wait once processing has
+            started and the time waited so far otherwise
+        """
+        wait_times = []
+        for lane in self._all_lanes:
+            for transaction in lane.get_queue():
+                wait_time = transaction.get_wait_time()
+                if wait_time is None:
+                    wait_time = self._time_since_created(transaction, self._current_time)
+                wait_times.append(wait_time)
+        return wait_times
+
+    def _time_since_created(self, transaction, time):
+        created = transaction.get_date_time()
+        if not isinstance(created, datetime.datetime):
+            # a date is taken as midnight
+            created = datetime.datetime.combine(created, datetime.time())
+        return time - created
+
+    def get_lane_queue_summary(self):
+        """
+        :returns: Dictionary object with queue by lane dictionaries keyed
+            by datetime
+        """
+        return self._lane_queue_summary
+
     def set_start_time(self, start_time):
         """
         :param start_time: datetime.datetime start time for Facility
@@ -545,57 +1624,69 @@ class Util:
         df_out = df_out[(df_out['trans date/time'] < datetime_value)]
         return df_out
 
-    def add_transaction_from_dataframe(self, facility, dataframe):
+    def add_transaction_from_dataframe(self, facility, dataframe, replay=False):
         """
-        Add elegible transactions from dataframe to Facility
+        Add elegible transactions from dataframe to Facility. The dataframe
+        index is used as the transaction ID, so a vehicle keeps the same ID,
+        and common random number stream, across runs.
 
         :param facility: Facility object to add transaction
         :param dataframe: dataframe of transactions to add
+        :param replay: if True, add each transaction to the lane recorded in
+            the 'Lane' column instead of the shortest eligible queue
         """
         df_out = dataframe
         n = df_out.shape[0]
         for i in range(n):
             df_row = df_out.iloc[i]
-            new_transaction = Transaction(df_row[0], df_row[2], df_row[3], i)
-            facility.add_transaction(new_transaction)
-
-    def plot_lane_queues(self, lane_list, lane_queue_dict, simulation_time):
-        """
-        Plot lane queues
+            new_transaction = Transaction(df_row.iloc[0], df_row.iloc[2],
+                                          df_row.iloc[3], df_out.index[i])
+            if replay:
+                facility.add_transaction_to_lane(new_transaction,
+                                                 int(df_row.iloc[1]))
+            else:
+                facility.add_transaction(new_transaction)
+
+    def run_facility(self, facility, dataframe, seconds, replay=False):
+        """
+        Advance facility one second at a time for the given number of
+        seconds. Transactions are added once the facility time passes their
+        'trans date/time', as in the sample simulation, but the dataframe is
+        sorted once instead of filtered every second.
+
+        :param facility: Facility object to simulate
+        :param dataframe: dataframe of transactions to add
+        :param seconds: int number of seconds to simulate
+        :param replay: if True, add transactions to their recorded lanes
+        """
+        import pandas as pd
+        df_sorted = dataframe.sort_values('trans date/time', kind='stable')
+        times = pd.to_datetime(df_sorted['trans date/time']).values
+        position = 0
+        for i in range(seconds):
+            current_time = np.datetime64(facility.get_current_time()).astype(times.dtype)
+            end = int(np.searchsorted(times, current_time, side='left'))
+            if end > position:
+                self.add_transaction_from_dataframe(
+                    facility, df_sorted.iloc[position:end], replay=replay)
+                position = end
+            facility.advance_time_facility()
+
+    def plot_lane_queues(self, lane_list, lane_queue_dict, simulation_time, directory='.'):
+        """
+        Plot lane queues. Rendering lives in the render module, which is
+        imported on first use so the simulation core does not load
+        matplotlib or OpenCV.
 
         :param lane_list: list of lanes
         :param lane_queue_dict: dictionary of lanes and queue length
         :param simulation_time: datetime object when data generated
+        :param directory: directory for the png file
         :returns: outputs png file
         """
-        ######
-        # need to add value validation to this method
-        ######
-        lanes = lane_list
-        data = lane_queue_dict
-        time = simulation_time
-
-        # get labels
-        labels = []
-        for lane in lanes:
-            labels.append(int(lane[0]))
-
-        values = data.values()
-
-        fig, ax = plt.subplots()
-        ax.bar(labels, values)
-        plt.title('Plaza Queue   ' + str(time))
-        plt.ylim(0, 100)
-        ax.set_ylabel('Queue Length')
-        ax.set_xlabel('Lane Number')
-
-        # save fig
-        name = self.fmt_date(time.year) + self.fmt_date(time.month) + \
-               self.fmt_date(time.day) + 'T' + self.fmt_date(time.hour) + \
-               self.fmt_date(time.minute) + self.fmt_date(time.second) + \
-               '.png'
-        plt.savefig(name)
-        plt.close()
+        import render
+        render.plot_lane_queues(lane_list, lane_queue_dict, simulation_time,
+                                directory=directory)
 
     def fmt_date(self, value):
         """
@@ -609,6 +1700,14 @@ class Util:
 
 # Test simulation
 if __name__ == '__main__':
+    import sys
+    import pandas as pd
+    import render
+
+    # --report writes a single queue report instead of a frame per second
+    # and a video
+    REPORT = '--report' in sys.argv
+
     SCRIPT_RUNTIME_START = datetime.datetime.now()
 
     # simulation time represents, current time while running model
@@ -624,6 +1723,7 @@ if __name__ == '__main__':
 
     # create test facility
     TEST_FACILITY = Facility(START_TIME)
+    TEST_FACILITY.set_rolling_windows()
 
     # add lanes
     LANE_LIST = [(1, 'GEN'), (2, 'GEN'), (3, 'GEN'),
@@ -635,12 +1735,12 @@ if __name__ == '__main__':
     # main loop
     ###################
 
-    # animation directory setup
-    ALL_FILES = os.listdir()
-    if 'output' in ALL_FILES:
-        shutil.rmtree('output')
-    os.mkdir('output')
-    os.chdir('output')
+    # animation directory setup, output is written there without changing
+    # the working directory
+    OUTPUT_DIRECTORY = 'output'
+    if os.path.isdir(OUTPUT_DIRECTORY):
+        shutil.rmtree(OUTPUT_DIRECTORY)
+    os.mkdir(OUTPUT_DIRECTORY)
 
     # increment time for analysis day
     for i in range(SECONDS_IN_DAY):
@@ -653,34 +1753,25 @@ if __name__ == '__main__':
         Util().add_transaction_from_dataframe(TEST_FACILITY, df_add)
 
         # create output graphic
-        Util().plot_lane_queues(LANE_LIST, TEST_FACILITY.get_lane_queue(), SIMULATION_TIME)
+        if not REPORT:
+            Util().plot_lane_queues(LANE_LIST, TEST_FACILITY.get_lane_queue(), SIMULATION_TIME,
+                                    directory=OUTPUT_DIRECTORY)
 
         # advance facility and simulation time
         SIMULATION_TIME = SIMULATION_TIME + ONE_SECOND
         TEST_FACILITY.advance_time_facility()
 
     # output queue summary
-    TEST_FACILITY.export_queue_summary_to_csv()
-
-    # create video file
-    WIDTH = 640
-    HEIGHT = 480
-    FPS = 30
-    SECONDS = SECONDS_IN_DAY / 30
-
-    FOURCC = VideoWriter_fourcc(*'MP42')
-    VIDEO = VideoWriter('test.avi', FOURCC, float(FPS), (WIDTH, HEIGHT))
-
-    IMG_FILES = os.listdir()
-    for i in IMG_FILES:
-        print(i)
-        img = cv2.imread(i)
-        VIDEO.write(img)
-    VIDEO.release()
-
-    # remove img files
-    IMG_FILES = os.listdir()
-    for i in IMG_FILES:
-        if 'png' in i:
-            os.remove(i)
+    TEST_FACILITY.export_queue_summary_to_csv(
+        os.path.join(OUTPUT_DIRECTORY, 'queue_summary.csv'))
+    TEST_FACILITY.export_rolling_summary_to_csv(
+        os.path.join(OUTPUT_DIRECTORY, 'rolling_summary.csv'))
+
+    # create report or video file
+    if REPORT:
+        render.write_report(TEST_FACILITY, name='queue_report.html',
+                            directory=OUTPUT_DIRECTORY)
+    else:
+        render.write_video(directory=OUTPUT_DIRECTORY, name='test.avi', fps=30,
+                           width=640, height=480)
     print('Runtime: ' + str(datetime.datetime.now() - SCRIPT_RUNTIME_START))
@@ -0,0 +1,75 @@
+"""
+Worker Pool
+
+Runs a method of one object over many arguments, in this process or in
+worker processes. The object is sent to each worker once, when the worker
+starts, rather than with every call.
+"""
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+# object shared with worker processes, set once per worker by _init_worker
+_WORKER_OBJECT = None
+
+
+def _init_worker(shared):
+    global _WORKER_OBJECT
+    _WORKER_OBJECT = shared
+
+
+def _run_worker(method_name, argument):
+    return getattr(_WORKER_OBJECT, method_name)(argument)
+
+
+class WorkerPool:
+    """
+    Calls a method of *shared* for each argument. With *max_workers* of 1
+    the calls run in this process, so results and errors are the same
+    without the cost of starting workers. Use as a context manager, or
+    call open and close to keep the workers between uses.
+
+    :param shared: object whose methods are called, must be picklable
+    :param max_workers: int number of worker processes. Default is the
+        number of processors.
+    """
+
+    def __init__(self, shared, max_workers=None):
+        self._shared = shared
+        self._max_workers = max_workers
+        self._executor = None
+
+    def open(self):
+        """
+        Start the worker processes
+        """
+        if self._max_workers != 1 and self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers,
+                                                 initializer=_init_worker,
+                                                 initargs=(self._shared,))
+
+    def close(self):
+        """
+        Shut down the worker processes
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def map(self, method_name, arguments):
+        """
+        :param method_name: String name of the method to call
+        :param arguments: iterable of single arguments to the method
+        :returns: list of results in argument order
+        """
+        if self._executor is None:
+            method = getattr(self._shared, method_name)
+            return [method(argument) for argument in arguments]
+        return list(self._executor.map(functools.partial(_run_worker, method_name),
+                                       arguments))